@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compares the two `get_num_available_sites` engines (see --engine) on a
+synthetic park, by default 1,000 sites over 365 days, for several numbers of
+nights. Both engines must return the same result. The last columns time the
+bitset engine with `compact=True` (maximal runs instead of every stay).
+
+    python benchmarks/bench_availability_engine.py --sites 1000 --days 365
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import camping  # noqa: E402
+
+START_DATE = datetime(2025, 1, 1)
+
+
+def synthetic_park(sites, days, availability, seed):
+    # Availability in the form returned by camping.get_park_information.
+    rng = random.Random(seed)
+    dates = [START_DATE.toordinal() + d for d in range(days)]
+    return {
+        str(100000 + site): [date for date in dates if rng.random() < availability]
+        for site in range(sites)
+    }
+
+
+def time_engine(engine, park_information, end_date, nights, runs, **kwargs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = engine(
+            park_information, START_DATE, end_date, nights=nights, **kwargs
+        )
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sites", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--availability", type=float, default=0.7)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    park_information = synthetic_park(
+        args.sites, args.days, args.availability, args.seed
+    )
+    end_date = START_DATE + timedelta(days=args.days)
+
+    print("{} sites x {} days, {:.0%} available, median of {} runs".format(
+        args.sites, args.days, args.availability, args.runs
+    ))
+    print("{:>8} {:>12} {:>12} {:>8} {:>10} {:>12} {:>8}".format(
+        "nights", "groupby ms", "bitset ms", "speedup", "ranges",
+        "compact ms", "runs",
+    ))
+    for nights in (1, 2, 3, 7, 14):
+        groupby_time, expected = time_engine(
+            camping.AVAILABILITY_ENGINES["groupby"],
+            park_information, end_date, nights, args.runs,
+        )
+        bitset_time, result = time_engine(
+            camping.AVAILABILITY_ENGINES["bitset"],
+            park_information, end_date, nights, args.runs,
+        )
+        if result != expected:
+            sys.exit("Engines disagree for {} night(s)".format(nights))
+        compact_time, compact = time_engine(
+            camping.AVAILABILITY_ENGINES["bitset"],
+            park_information, end_date, nights, args.runs, compact=True,
+        )
+        print("{:>8} {:>12.1f} {:>12.1f} {:>7.1f}x {:>10} {:>12.1f} {:>8}".format(
+            nights,
+            groupby_time * 1000,
+            bitset_time * 1000,
+            groupby_time / bitset_time,
+            sum(len(ranges) for ranges in result[2].values()),
+            compact_time * 1000,
+            sum(len(runs) for runs in compact[2].values()),
+        ))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Measures with tracemalloc the memory used to ingest a year of availability
+responses for a synthetic park, by default 2,000 sites: the peak while the
+responses are read, and what is retained once they are collapsed.
+
+"buffered" reads every month into a list before collapsing it into lists
+of ordinals, as `get_park_information` used to; "streaming" passes the
+responses to `camping.collapse_park_information` one at a time, the way
+`get_park_information` now does. Both must hold the same availability.
+
+    python benchmarks/bench_ingestion_memory.py --sites 2000 --months 12
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import camping  # noqa: E402
+from utils import day_calendar  # noqa: E402
+
+START_DATE = datetime(2025, 1, 1)
+
+
+def synthetic_months(sites, months, availability, seed):
+    # One availability response per month, built when it is asked for like
+    # a response arriving from recreation.gov.
+    rng = random.Random(seed)
+    for month_date in camping.get_months(START_DATE, end_date(months)):
+        days = []
+        day = month_date
+        while day.month == month_date.month:
+            days.append(day.strftime("%Y-%m-%dT00:00:00Z"))
+            day += timedelta(days=1)
+        campsites = {}
+        for site in range(sites):
+            availabilities = {
+                day: "Available" if rng.random() < availability else "Reserved"
+                for day in days
+            }
+            campsites[str(100000 + site)] = {
+                "availabilities": availabilities,
+                "campsite_id": str(100000 + site),
+                "campsite_type": "STANDARD NONELECTRIC",
+            }
+        yield {"campsites": campsites}
+
+
+def end_date(months):
+    return datetime(START_DATE.year + months // 12, months % 12 + 1, 1) - timedelta(days=1)
+
+
+def collapse_to_lists(api_data, calendar):
+    # The previous representation: a list per site, one per site even
+    # without availability.
+    data = {}
+    for month_data in api_data:
+        for campsite_id, campsite_data in month_data["campsites"].items():
+            a = data.setdefault(campsite_id, [])
+            for date, value in campsite_data["availabilities"].items():
+                if value == "Available":
+                    ordinal = calendar.parse_response_date(date)
+                    if ordinal is not None:
+                        a.append(ordinal)
+    return data
+
+
+def measure(ingest):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = ingest()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak, retained
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sites", type=int, default=2000)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--availability", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    calendar = day_calendar.get_calendar(START_DATE, end_date(args.months))
+
+    def months():
+        return synthetic_months(
+            args.sites, args.months, args.availability, args.seed
+        )
+
+    print("{} sites x {} months, {:.0%} available".format(
+        args.sites, args.months, args.availability
+    ))
+    print("{:>10} {:>10} {:>12} {:>14}".format(
+        "", "time s", "peak MiB", "retained MiB"
+    ))
+    results = {}
+    for name, ingest in (
+        ("buffered", lambda: collapse_to_lists(list(months()), calendar)),
+        ("streaming", lambda: camping.collapse_park_information(months(), calendar)),
+    ):
+        results[name], elapsed, peak, retained = measure(ingest)
+        print("{:>10} {:>10.2f} {:>12.1f} {:>14.1f}".format(
+            name, elapsed, peak / 2 ** 20, retained / 2 ** 20
+        ))
+
+    buffered, streaming = results["buffered"], results["streaming"]
+    if buffered.keys() != streaming.keys() or any(
+        list(streaming[site]) != buffered[site] for site in buffered
+    ):
+        sys.exit("The two ingestions disagree")
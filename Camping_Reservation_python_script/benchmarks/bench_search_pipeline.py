@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Compares the latency of one website search run in-process
+(`camping_wrapper.search_and_filter`) with the old subprocess chain, where
+the website ran camping_notification.py, which ran camping_wrapper.py, which
+ran camping.py, each level parsing the text output of the one below.
+
+Both paths read the same synthetic park from a pre-filled SQLite cache, so
+no requests are sent to recreation.gov and the difference is interpreter
+startup, imports and text round-trips. The old chain is emulated by this
+script calling itself: the intermediate levels only relay the output, which
+makes the comparison conservative.
+
+    python benchmarks/bench_search_pipeline.py --runs 10 --sites 200
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+PARK_ID = "999999"
+START_DATE = "2025-06-01"
+END_DATE = "2025-07-15"
+NIGHTS = 2
+TTL = 24 * 3600
+
+
+def seed_cache(path, sites):
+    from clients.recreation_client import RecreationClient
+    from utils import formatter
+    from utils.sqlite_cache import SQLiteCache
+
+    availability = SQLiteCache(path, namespace="availability", ttl=TTL)
+    for month in (datetime(2025, 6, 1), datetime(2025, 7, 1)):
+        campsites = {}
+        for site in range(sites):
+            availabilities = {}
+            day = month
+            while day.month == month.month:
+                # Every site is booked on a different pattern of days.
+                free = (day.day + site) % 5 != 0
+                availabilities[day.strftime("%Y-%m-%dT00:00:00Z")] = (
+                    "Available" if free else "Reserved"
+                )
+                day += timedelta(days=1)
+            campsites[str(100000 + site)] = {
+                "availabilities": availabilities,
+                "campsite_id": str(100000 + site),
+                "campsite_type": "STANDARD NONELECTRIC",
+            }
+        key = "{}:{}".format(PARK_ID, formatter.format_date(month))
+        availability.set(key, {"campsites": campsites})
+
+    metadata = SQLiteCache(path, namespace="metadata", ttl=TTL)
+    metadata.set(PARK_ID, {"facility_name": "BENCHMARK CAMPGROUND"})
+    RecreationClient.close_session()
+
+
+def run_legacy_level(level, cache_file):
+    """
+    One level of the old chain: run the next level and relay its output.
+    """
+    if level == "notification":
+        command = [
+            sys.executable, os.path.abspath(__file__), "--level", "wrapper"
+        ]
+    else:
+        command = [
+            sys.executable,
+            os.path.join(SCRIPT_DIR, "camping.py"),
+            "--start-date", START_DATE,
+            "--end-date", END_DATE,
+            "--parks", PARK_ID,
+            "--nights", str(NIGHTS),
+            "--show-campsite-info",
+            "--cache-ttl", str(TTL),
+            "--metadata-cache-ttl", str(TTL),
+        ]
+    command.extend(["--cache-file", cache_file])
+    result = subprocess.run(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=SCRIPT_DIR,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    lines = [line.strip() for line in result.stdout.splitlines()]
+    print("\n".join(line for line in lines if line))
+
+
+def time_legacy(cache_file):
+    started = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--level",
+            "notification",
+            "--cache-file",
+            cache_file,
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+        cwd=SCRIPT_DIR,
+    )
+    return time.perf_counter() - started
+
+
+def time_in_process(cache_file):
+    import camping_wrapper
+    from clients.recreation_client import RecreationClient
+
+    RecreationClient.configure_cache(TTL, path=cache_file)
+    RecreationClient.configure_metadata_cache(TTL, path=cache_file)
+    started = time.perf_counter()
+    camping_wrapper.search_and_filter(START_DATE, END_DATE, [PARK_ID], NIGHTS)
+    return time.perf_counter() - started
+
+
+def report(name, timings):
+    print(
+        "{:<12} median {:8.1f} ms   mean {:8.1f} ms   min {:8.1f} ms".format(
+            name,
+            statistics.median(timings) * 1000,
+            statistics.mean(timings) * 1000,
+            min(timings) * 1000,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sites", type=int, default=100)
+    parser.add_argument("--level", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.level:
+        run_legacy_level(args.level, args.cache_file)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_file = os.path.join(directory, "cache.sqlite3")
+        seed_cache(cache_file, args.sites)
+
+        legacy = [time_legacy(cache_file) for _ in range(args.runs)]
+        in_process = [time_in_process(cache_file) for _ in range(args.runs)]
+
+    print("{} runs, {} sites, {} -> {}, {} nights".format(
+        args.runs, args.sites, START_DATE, END_DATE, NIGHTS
+    ))
+    report("subprocess", legacy)
+    report("in-process", in_process)
+    print("speedup      {:.1f}x".format(
+        statistics.median(legacy) / statistics.median(in_process)
+    ))
@@ -4,8 +4,10 @@
 import json
 import logging
 import sys
+from array import array
 from collections import defaultdict
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from itertools import count, groupby
 from typing import List
 from dateutil import rrule
@@ -13,8 +15,14 @@ from dateutil import rrule
 from clients.recreation_client import RecreationClient
 from enums.date_format import DateFormat
 from enums.emoji import Emoji
-from utils import formatter
+from models.availability import BatchResult, ParkAvailability, Query, SearchResult
+from utils import availability_matrix, day_calendar, formatter
+from utils.availability_memo import AvailabilityMemo
 from utils.camping_argparser import CampingArgumentParser
+from utils.incremental import IncrementalAvailability, IncrementalStats
+from utils.nights import is_night_counts, resolve_nights
+from utils.site_filter import SiteExclusions, SiteFilter, excluded_for_park
+from utils.windows import window_span
 
 LOG = logging.getLogger(__name__)
 log_formatter = logging.Formatter(
@@ -26,7 +34,7 @@ LOG.addHandler(sh)
 
 
 def get_park_information(
-    park_id, start_date, end_date, campsite_type=None, campsite_ids=(), excluded_site_ids=[]
+    park_id, start_date, end_date, campsite_type=None, campsite_ids=(), excluded_site_ids=[], max_concurrency=1, months=None,
 ):
     """
     This function consumes the user intent, collects the necessary information
@@ -41,60 +49,146 @@ def get_park_information(
 
     The output of this function looks like this:
 
-    {"<campsite_id>": [<date>, <date>]}
+    {"<campsite_id>": array("i", [<ordinal>, <ordinal>])}
 
-    Where the values are a list of ISO 8601 date strings representing dates
-    where the campsite is available.
+    Where the values are the date ordinals (see `date.toordinal`) of the
+    dates between `start_date` and `end_date` where the campsite is
+    available, in a compact array. The dates of the response are parsed
+    here, once; they are only formatted again for output. Sites without any
+    available date share the empty NO_AVAILABILITY.
 
     Notably, the output doesn't tell you which sites are available. The rest of
     the script doesn't need to know this to determine whether sites are available.
+
+    Each month is collapsed as soon as it arrives and its response dropped,
+    so only the available days are kept in memory. With `max_concurrency`
+    greater than 1 the months are fetched in parallel by up to that many
+    threads. The result is identical to the serial fetch.
+
+    `months` overrides the months to download, e.g. to skip the months
+    between the windows of `plan_months`. `excluded_site_ids` may be a
+    SiteExclusions, as returned by `load_exclusion_file`, or any collection
+    of campsite IDs.
     """
 
-    # Get each first of the month for months in the range we care about.
+    if months is None:
+        months = get_months(start_date, end_date)
+
+    # Get data for each month.
+    api_data = iter_months(park_id, months, max_concurrency=max_concurrency)
+
+    return collapse_park_information(
+        api_data,
+        day_calendar.get_calendar(start_date, end_date),
+        campsite_type,
+        campsite_ids,
+        excluded_for_park(excluded_site_ids, park_id),
+    )
+
+
+def get_months(start_date, end_date):
+    """
+    Returns each first of the month for months in the range we care about.
+    """
     start_of_month = datetime(start_date.year, start_date.month, 1)
-    months = list(
+    return list(
         rrule.rrule(rrule.MONTHLY, dtstart=start_of_month, until=end_date)
     )
 
-    # Get data for each month.
-    api_data = []
-    for month_date in months:
-        api_data.append(RecreationClient.get_availability(park_id, month_date))
 
-    # Collapse the data into the described output format.
-    # Filter by campsite_type if necessary.
+def plan_months(windows):
+    """
+    Returns the first of every month needed by any of `windows`, a list of
+    (start_date, end_date) pairs, each month once and in order, so
+    overlapping windows share their downloads and the months between
+    disjoint windows are skipped.
+    """
+    months = set()
+    for start_date, end_date in windows:
+        months.update(get_months(start_date, end_date))
+    return sorted(months)
+
+
+# The availability of every site without an available date, see
+# `get_park_information`.
+NO_AVAILABILITY = array("i")
+
+
+def collapse_park_information(
+    api_data, calendar, campsite_type=None, campsite_ids=(), excluded_site_ids=[]
+):
+    """
+    Collapses the availability responses of every month, any iterable of
+    them, into the output format described in `get_park_information`.
+    Dates outside `calendar`, a DayCalendar, are dropped. Each response is
+    done with before the next one is read.
+
+    `excluded_site_ids` is a SiteIdSet or a collection of campsite IDs; the
+    filters are compiled once (see SiteFilter) and checked once per site.
+    """
+    site_filter = SiteFilter(campsite_type, campsite_ids, excluded_site_ids)
     data = {}
 
     for month_data in api_data:
         for campsite_id, campsite_data in month_data["campsites"].items():
-            if campsite_id in excluded_site_ids:
+            if site_filter.excludes(campsite_id):
                 continue
-            available = []
-            a = data.setdefault(campsite_id, [])
+            if not site_filter.matches(campsite_data):
+                data.setdefault(campsite_id, NO_AVAILABILITY)
+                continue
+
+            available = array("i")
             for date, availability_value in campsite_data[
                 "availabilities"
             ].items():
                 if availability_value != "Available":
                     continue
 
-                if (
-                    campsite_type
-                    and campsite_type != campsite_data["campsite_type"]
-                ):
-                    continue
-
-                if (
-                    len(campsite_ids) > 0
-                    and int(campsite_data["campsite_id"]) not in campsite_ids
-                ):
-                    continue
+                ordinal = calendar.parse_response_date(date)
+                if ordinal is not None:
+                    available.append(ordinal)
 
-                available.append(date)
-            if available:
-                a += available
+            a = data.get(campsite_id, NO_AVAILABILITY)
+            if not available:
+                data.setdefault(campsite_id, NO_AVAILABILITY)
+            elif a is NO_AVAILABILITY:
+                data[campsite_id] = available
+            else:
+                a.extend(available)
 
     return data
 
+
+def iter_months(park_id, months, max_concurrency=1):
+    """
+    Yields the availability response for each month, in the same order as
+    `months`, using a bounded thread pool when `max_concurrency` allows it.
+    Responses are not kept once they have been yielded.
+    """
+    workers = min(max_concurrency or 1, len(months))
+    if workers <= 1:
+        for month_date in months:
+            yield RecreationClient.get_availability(park_id, month_date)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # map() yields results in submission order, which keeps the merged
+        # output deterministic no matter which month finishes first.
+        yield from executor.map(
+            lambda month_date: RecreationClient.get_availability(
+                park_id, month_date
+            ),
+            months,
+        )
+
+
+def fetch_months(park_id, months, max_concurrency=1):
+    """
+    Returns the availability response for each month, see `iter_months`.
+    """
+    return list(iter_months(park_id, months, max_concurrency=max_concurrency))
+
+
 def is_weekend(date):
     weekday = date.weekday()
 
@@ -102,27 +196,41 @@ def is_weekend(date):
 
 
 def get_num_available_sites(
-    park_information, start_date, end_date, nights=None, weekends_only=False,
+    park_information, start_date, end_date, nights=None, weekends_only=False, compact=False,
 ):
+    """
+    Returns `(num_available, maximum, available_dates_by_campsite_id)` for
+    stays of `nights` consecutive nights.
+
+    With `compact`, each site has one `{"start": date, "end": date}` entry
+    per maximal run of at least `nights` free nights rather than one per
+    stay; stays can start on any day of a run up to `nights` days before its
+    end.
+
+    `nights` may also be a collection of night counts (e.g. `range(2, 5)`),
+    which are all computed in the same pass over the sites and returned as
+    `{nights: (num_available, maximum, available_dates_by_campsite_id)}`.
+    """
     maximum = len(park_information)
+    calendar = day_calendar.get_calendar(start_date, end_date)
 
-    num_available = 0
     num_days = (end_date - start_date).days
-    dates = [end_date - timedelta(days=i) for i in range(1, num_days + 1)]
+    dates = range(calendar.first, calendar.first + num_days)
     if weekends_only:
-        dates = filter(is_weekend, dates)
-    dates = set(
-        formatter.format_date(
-            i, format_string=DateFormat.ISO_DATE_FORMAT_RESPONSE.value
+        dates = set(
+            ordinal for ordinal in dates if is_weekend(calendar.date(ordinal))
         )
-        for i in dates
-    )
 
-    if nights not in range(1, num_days + 1):
-        nights = num_days
-        LOG.debug("Setting number of nights to {}.".format(nights))
+    night_counts = nights if is_night_counts(nights) else [nights]
+    resolved = {n: resolve_nights(n, num_days) for n in night_counts}
+    for n, resolved_n in resolved.items():
+        if n != resolved_n:
+            LOG.debug("Setting number of nights to {}.".format(resolved_n))
+    num_available = dict.fromkeys(set(resolved.values()), 0)
+    available_dates_by_campsite_id = {
+        n: defaultdict(list) for n in num_available
+    }
 
-    available_dates_by_campsite_id = defaultdict(list)
     for site, availabilities in park_information.items():
         # List of dates that are in the desired range for this site.
         desired_available = []
@@ -135,102 +243,493 @@ def get_num_available_sites(
         if not desired_available:
             continue
 
-        appropriate_consecutive_ranges = consecutive_nights(
-            desired_available, nights
-        )
+        # The runs are shared by every night count.
+        runs = consecutive_runs(desired_available)
+        for n in num_available:
+            if compact:
+                appropriate_consecutive_ranges = [
+                    (r[0], r[-1] + 1) for r in runs if len(r) >= n
+                ]
+            else:
+                appropriate_consecutive_ranges = stays_in_runs(runs, n)
 
-        if appropriate_consecutive_ranges:
-            num_available += 1
-            LOG.debug("Available site {}: {}".format(num_available, site))
+            if appropriate_consecutive_ranges:
+                num_available[n] += 1
+                LOG.debug("Available site {}: {}".format(num_available[n], site))
 
-        for r in appropriate_consecutive_ranges:
-            start, end = r
-            available_dates_by_campsite_id[int(site)].append(
-                {"start": start, "end": end}
-            )
+            for start, end in appropriate_consecutive_ranges:
+                available_dates_by_campsite_id[n][int(site)].append(
+                    {"start": calendar.date(start), "end": calendar.date(end)}
+                )
 
-    return num_available, maximum, available_dates_by_campsite_id
+    results = {
+        n: (
+            num_available[resolved_n],
+            maximum,
+            available_dates_by_campsite_id[resolved_n],
+        )
+        for n, resolved_n in resolved.items()
+    }
+    if is_night_counts(nights):
+        return results
+    return results[nights]
 
 
-def consecutive_nights(available, nights):
+def consecutive_runs(available):
     """
-    Returns a list of dates from which you can start that have
-    enough consecutive nights.
-
-    If there is one or more entries in this list, there is at least one
-    date range for this site that is available.
+    Splits `available`, a sorted list of date ordinals, into runs of
+    consecutive dates.
     """
-    ordinal_dates = [
-        datetime.strptime(
-            dstr, DateFormat.ISO_DATE_FORMAT_RESPONSE.value
-        ).toordinal()
-        for dstr in available
-    ]
     c = count()
+    return list(list(g) for _, g in groupby(available, lambda x: x - next(c)))
 
-    consecutive_ranges = list(
-        list(g) for _, g in groupby(ordinal_dates, lambda x: x - next(c))
-    )
 
+def stays_in_runs(runs, nights):
+    """
+    Returns a list of (start, end) date ordinals of the stays of `nights`
+    consecutive nights within `runs` (see `consecutive_runs`). `end` is the
+    day after the last night.
+    """
     long_enough_consecutive_ranges = []
-    for r in consecutive_ranges:
+    for r in runs:
         # Skip ranges that are too short.
         if len(r) < nights:
             continue
         for start_index in range(0, len(r) - nights + 1):
-            start_nice = formatter.format_date(
-                datetime.fromordinal(r[start_index]),
-                format_string=DateFormat.INPUT_DATE_FORMAT.value,
+            long_enough_consecutive_ranges.append(
+                (r[start_index], r[start_index + nights - 1] + 1)
             )
-            end_nice = formatter.format_date(
-                datetime.fromordinal(r[start_index + nights - 1] + 1),
-                format_string=DateFormat.INPUT_DATE_FORMAT.value,
-            )
-            long_enough_consecutive_ranges.append((start_nice, end_nice))
 
     return long_enough_consecutive_ranges
 
 
+# Implementations of `get_num_available_sites` by name, see --engine.
+AVAILABILITY_ENGINES = {
+    "groupby": get_num_available_sites,
+    "bitset": availability_matrix.get_num_available_sites,
+}
+
+# Memoized results of the engines, see `configure_memo`.
+availability_memo = None
+
+
+def configure_memo(max_entries):
+    """
+    Remembers the last `max_entries` availability results by the content of
+    the park information and the search parameters (see AvailabilityMemo);
+    0 turns memoization off.
+    """
+    global availability_memo
+    availability_memo = AvailabilityMemo(max_entries) if max_entries else None
+
+
+def get_memo_stats():
+    if availability_memo is None:
+        return None
+    return availability_memo.stats.as_dict()
+
+
+# IncrementalAvailability of every park and search, see
+# `configure_incremental`.
+incremental_parks = None
+incremental_stats = IncrementalStats()
+
+
+def configure_incremental(enabled):
+    """
+    Keeps the availability of every park and search between checks, so the
+    next check of the same search only evaluates the sites whose
+    availability changed (see IncrementalAvailability).
+    """
+    global incremental_parks
+    incremental_parks = {} if enabled else None
+
+
+def get_incremental_stats():
+    if incremental_parks is None:
+        return None
+    return incremental_stats.as_dict()
+
+
+def can_prefilter(start_date, end_date, nights=None):
+    """
+    The search endpoint only counts sites that are available for the whole
+    range, so a count of zero only rules out a park when every night of the
+    range is needed. Shorter stays need the per-month detail.
+    """
+    num_days = (end_date - start_date).days
+    if is_night_counts(nights):
+        return all(n not in range(1, num_days) for n in nights)
+    return nights not in range(1, num_days)
+
+
+def prefiltered_park_info(park_id, availability_counts):
+    """
+    Returns the `check_park` result for a park the search endpoint reports
+    no availability for, or None if the park needs a full check.
+    """
+    if availability_counts is None or availability_counts.get("Available"):
+        return None
+    LOG.debug(
+        "Skipping park {}, no availability: {}".format(
+            park_id, availability_counts
+        )
+    )
+    return ParkAvailability(
+        0,
+        sum(availability_counts.values()),
+        defaultdict(list),
+        RecreationClient.get_park_name(park_id),
+    )
+
+
 def check_park(
-    park_id, start_date, end_date, campsite_type, campsite_ids=(), nights=None, weekends_only=False, excluded_site_ids=[],
+    park_id, start_date, end_date, campsite_type, campsite_ids=(), nights=None, weekends_only=False, excluded_site_ids=[], max_concurrency=1, prefilter=False, availability_counts=None, engine="bitset", compact=False, windows=None,
 ):
+    """
+    Returns the ParkAvailability of a park, or `{nights: ParkAvailability}`
+    if `nights` is a collection of night counts.
+
+    With `windows`, a list of (start_date, end_date) pairs, `start_date`
+    and `end_date` are widened to cover them all, the months of all windows
+    are downloaded once and the result is `{window: result}` for every window.
+
+    With `prefilter`, the cheap search endpoint is asked first (unless the
+    counts were already fetched and passed as `availability_counts`) and the
+    per-month download is skipped if the park has no availability at all.
+    `engine` picks the implementation of `get_num_available_sites` (see
+    AVAILABILITY_ENGINES), `compact` is passed on to it.
+    """
+    if prefilter and windows is None and can_prefilter(start_date, end_date, nights):
+        if availability_counts is None:
+            availability_counts = RecreationClient.get_availability_counts(
+                [park_id], start_date, end_date
+            ).get(str(park_id))
+        info = prefiltered_park_info(park_id, availability_counts)
+        if info is not None and is_night_counts(nights):
+            return {n: info for n in nights}
+        if info is not None:
+            return info
+
+    if incremental_parks is not None and windows is None:
+        return check_park_incremental(
+            park_id, start_date, end_date, campsite_type, campsite_ids, nights, weekends_only, excluded_site_ids, max_concurrency, engine, compact,
+        )
+
+    months = None
+    if windows is not None:
+        start_date, end_date = window_span(windows, start_date, end_date)
+        months = plan_months(windows)
     park_information = get_park_information(
-        park_id, start_date, end_date, campsite_type, campsite_ids, excluded_site_ids=excluded_site_ids,
+        park_id, start_date, end_date, campsite_type, campsite_ids, excluded_site_ids=excluded_site_ids, max_concurrency=max_concurrency, months=months,
+    )
+    log_park_information(park_id, park_information)
+    park_name = RecreationClient.get_park_name(park_id)
+    if windows is not None:
+        return {
+            (window_start, window_end): park_availability(
+                park_information, park_name, window_start, window_end, nights, weekends_only, engine, compact,
+            )
+            for window_start, window_end in windows
+        }
+    return park_availability(
+        park_information, park_name, start_date, end_date, nights, weekends_only, engine, compact,
+    )
+
+
+def check_park_incremental(
+    park_id, start_date, end_date, campsite_type, campsite_ids, nights, weekends_only, excluded_site_ids, max_concurrency, engine, compact,
+):
+    """
+    `check_park` reusing what the previous check of the same park and
+    search computed from months and sites that did not change.
+    """
+    night_counts = tuple(nights) if is_night_counts(nights) else (nights,)
+    excluded_site_ids = excluded_for_park(excluded_site_ids, park_id)
+    key = (
+        str(park_id),
+        start_date,
+        end_date,
+        campsite_type,
+        tuple(campsite_ids),
+        excluded_site_ids,
+        night_counts,
+        weekends_only,
+        engine,
+        compact,
     )
+    state = incremental_parks.get(key)
+    if state is None:
+        calendar = day_calendar.get_calendar(start_date, end_date)
+        state = incremental_parks.setdefault(
+            key,
+            IncrementalAvailability(
+                lambda month_data: collapse_park_information(
+                    [month_data], calendar, campsite_type, campsite_ids, excluded_site_ids
+                ),
+                lambda park_information: AVAILABILITY_ENGINES[engine](
+                    park_information, start_date, end_date, nights=night_counts, weekends_only=weekends_only, compact=compact,
+                ),
+                incremental_stats,
+            ),
+        )
+
+    months = get_months(start_date, end_date)
+    available_sites = state.update(
+        months, fetch_months(park_id, months, max_concurrency=max_concurrency)
+    )
+    park_name = RecreationClient.get_park_name(park_id)
+    if is_night_counts(nights):
+        return {
+            n: ParkAvailability(*available_sites[n], park_name)
+            for n in nights
+        }
+    return ParkAvailability(*available_sites[nights], park_name)
+
+
+def log_park_information(park_id, park_information):
+    if not LOG.isEnabledFor(logging.DEBUG):
+        return
     LOG.debug(
         "Information for park {}: {}".format(
-            park_id, json.dumps(park_information, indent=2)
+            park_id,
+            json.dumps(
+                {site: list(days) for site, days in park_information.items()},
+                indent=2,
+            ),
         )
     )
-    park_name = RecreationClient.get_park_name(park_id)
-    current, maximum, availabilities_filtered = get_num_available_sites(
-        park_information, start_date, end_date, nights=nights, weekends_only=weekends_only,
+
+
+def park_availability(
+    park_information, park_name, start_date, end_date, nights, weekends_only, engine, compact,
+):
+    """
+    Evaluates the downloaded `park_information` between `start_date` and
+    `end_date` and returns the `check_park` result.
+    """
+    def compute():
+        return AVAILABILITY_ENGINES[engine](
+            park_information, start_date, end_date, nights=nights, weekends_only=weekends_only, compact=compact,
+        )
+
+    if availability_memo is None:
+        available_sites = compute()
+    else:
+        params = (
+            start_date,
+            end_date,
+            tuple(nights) if is_night_counts(nights) else nights,
+            weekends_only,
+            engine,
+            compact,
+        )
+        available_sites = availability_memo.get_or_compute(
+            park_information, params, compute
+        )
+    if is_night_counts(nights):
+        return {
+            n: ParkAvailability(*available_sites[n], park_name)
+            for n in nights
+        }
+    return ParkAvailability(*available_sites, park_name)
+
+
+def check_parks(parks, *check_park_args, parallel_parks=1, **check_park_kwargs):
+    """
+    Runs `check_park` for every park and yields `(park_id, info)` pairs.
+    `availability_counts` may hold the search counts of all parks by park ID,
+    as returned by `RecreationClient.get_availability_counts`.
+
+    With `parallel_parks` greater than 1, up to that many parks are checked at
+    the same time and each pair is yielded as soon as its park finishes, so the
+    order is the completion order rather than the order of `parks`.
+    """
+    parks = list(dict.fromkeys(parks))
+    workers = min(parallel_parks or 1, len(parks))
+    # Search counts of every park by park ID, see `check_park`.
+    counts_by_park_id = check_park_kwargs.pop("availability_counts", None)
+
+    def check(park_id):
+        kwargs = check_park_kwargs
+        if counts_by_park_id is not None:
+            # Parks missing from the batch search get a full check rather
+            # than a search of their own.
+            counts = counts_by_park_id.get(str(park_id))
+            kwargs = dict(
+                kwargs,
+                availability_counts=counts,
+                prefilter=kwargs.get("prefilter") and counts is not None,
+            )
+        return check_park(park_id, *check_park_args, **kwargs)
+
+    if workers <= 1:
+        for park_id in parks:
+            yield park_id, check(park_id)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    try:
+        for park_id in parks:
+            futures[executor.submit(check, park_id)] = park_id
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # Don't start parks nobody is going to read anymore (by hand, as
+        # shutdown's cancel_futures needs Python 3.9).
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def plan_fetches(queries):
+    """
+    Returns the months of each query and the `(park_id, month)` pairs all
+    queries need, each pair once and in the order they are first needed.
+    """
+    months_by_query = [
+        get_months(query.start_date, query.end_date) for query in queries
+    ]
+    fetches = {}
+    for query, months in zip(queries, months_by_query):
+        for month_date in months:
+            fetches.setdefault((str(query.park_id), month_date), None)
+    return months_by_query, list(fetches)
+
+
+def run_queries(queries, max_concurrency=1):
+    """
+    Answers a batch of Query, e.g. several parks and windows for several
+    users, downloading every park-month needed by any query only once (up to
+    `max_concurrency` at a time, through the client's cache) and evaluating
+    every query on the shared responses. Returns a BatchResult.
+    """
+    queries = [
+        query._replace(
+            start_date=formatter.parse_date(query.start_date),
+            end_date=formatter.parse_date(query.end_date),
+        )
+        for query in queries
+    ]
+    months_by_query, fetches = plan_fetches(queries)
+    park_ids = list(dict.fromkeys(park_id for park_id, _ in fetches))
+    RecreationClient.warm_metadata_cache(park_ids, max_concurrency=max_concurrency)
+    park_names = {
+        park_id: RecreationClient.get_park_name(park_id) for park_id in park_ids
+    }
+
+    workers = min(max_concurrency or 1, len(fetches))
+    if workers <= 1:
+        responses = [
+            RecreationClient.get_availability(*fetch) for fetch in fetches
+        ]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(
+                executor.map(
+                    lambda fetch: RecreationClient.get_availability(*fetch),
+                    fetches,
+                )
+            )
+    response_by_fetch = dict(zip(fetches, responses))
+
+    results = []
+    for query, months in zip(queries, months_by_query):
+        park_information = collapse_park_information(
+            [
+                response_by_fetch[(str(query.park_id), month_date)]
+                for month_date in months
+            ],
+            day_calendar.get_calendar(query.start_date, query.end_date),
+            query.campsite_type,
+            query.campsite_ids,
+            excluded_for_park(query.excluded_site_ids, query.park_id),
+        )
+        results.append(
+            park_availability(
+                park_information,
+                park_names[str(query.park_id)],
+                query.start_date,
+                query.end_date,
+                query.nights,
+                query.weekends_only,
+                query.engine,
+                query.compact,
+            )
+        )
+
+    batch = BatchResult(
+        results, sum(len(months) for months in months_by_query), len(fetches)
+    )
+    LOG.debug(
+        "{} queries needed {} park-months, downloaded {} ({} requests saved)".format(
+            len(queries),
+            batch.requested_months,
+            batch.fetched_months,
+            batch.saved_requests,
+        )
+    )
+    return batch
+
+
+def generate_park_summary(park_id, info):
+    current, maximum, _, park_name = info
+    if current:
+        emoji = Emoji.SUCCESS.value
+    else:
+        emoji = Emoji.FAILURE.value
+
+    return "{emoji} {park_name} ({park_id}): {current} site(s) available out of {maximum} site(s)".format(
+        emoji=emoji,
+        park_name=park_name,
+        park_id=park_id,
+        current=current,
+        maximum=maximum,
     )
-    return current, maximum, availabilities_filtered, park_name
+
+
+def count_sites_by_start_date(runs_by_site_id, nights):
+    """
+    Returns `{date: number of sites}` for every day a stay of `nights`
+    nights can start on, from compact runs (see `get_num_available_sites`).
+    The work is proportional to the number of runs and start dates, not to
+    the number of stays.
+    """
+    # +1 on the first start day of each run, -1 after its last one.
+    changes = defaultdict(int)
+    for runs in runs_by_site_id.values():
+        for run in runs:
+            changes[run["start"].toordinal()] += 1
+            changes[run["end"].toordinal() - nights + 1] -= 1
+
+    sites_by_start_date = {}
+    sites = 0
+    ordinals = sorted(changes)
+    for ordinal, next_ordinal in zip(ordinals, ordinals[1:]):
+        sites += changes[ordinal]
+        if sites:
+            for day in range(ordinal, next_ordinal):
+                sites_by_start_date[datetime.fromordinal(day).date()] = sites
+    return sites_by_start_date
 
 
 def generate_human_output(
-    info_by_park_id, start_date, end_date, gen_campsite_info=False
+    info_by_park_id, start_date, end_date, gen_campsite_info=False, compact_nights=None,
 ):
+    """
+    `compact_nights` is the number of nights searched for if the
+    availabilities are compact runs rather than stays (see
+    `get_num_available_sites`).
+    """
     out = []
     has_availabilities = False
     for park_id, info in info_by_park_id.items():
-        current, maximum, available_dates_by_site_id, park_name = info
+        current, _, available_dates_by_site_id, _ = info
         if current:
-            emoji = Emoji.SUCCESS.value
             has_availabilities = True
-        else:
-            emoji = Emoji.FAILURE.value
-
-        out.append(
-            "{emoji} {park_name} ({park_id}): {current} site(s) available out of {maximum} site(s)".format(
-                emoji=emoji,
-                park_name=park_name,
-                park_id=park_id,
-                current=current,
-                maximum=maximum,
-            )
-        )
+
+        out.append(generate_park_summary(park_id, info))
 
         # Displays campsite ID and availability dates.
         if gen_campsite_info and available_dates_by_site_id:
@@ -241,11 +740,26 @@ def generate_human_output(
                     )
                 )
                 for date in dates:
+                    if compact_nights:
+                        out.append(
+                            "    * {start} -> {end} ({nights} free nights)".format(
+                                start=date["start"],
+                                end=date["end"],
+                                nights=(date["end"] - date["start"]).days,
+                            )
+                        )
+                        continue
                     out.append(
                         "    * {start} -> {end}".format(
                             start=date["start"], end=date["end"]
                         )
                     )
+            if compact_nights:
+                out.append("  * Sites available by start date:")
+                for day, sites in count_sites_by_start_date(
+                    available_dates_by_site_id, compact_nights
+                ).items():
+                    out.append("    * {}: {}".format(day, sites))
 
     if has_availabilities:
         out.insert(
@@ -260,16 +774,147 @@ def generate_human_output(
     return "\n".join(out), has_availabilities
 
 
-def generate_json_output(info_by_park_id):
+def generate_json_output(info_by_park_id, compact_nights=None):
+    availabilities_by_park_id, has_availabilities = json_availabilities(
+        info_by_park_id, compact_nights
+    )
+    return json.dumps(availabilities_by_park_id), has_availabilities
+
+
+def json_availabilities(info_by_park_id, compact_nights=None):
+    """
+    With `compact_nights` (see `generate_human_output`), each park lists the
+    runs of each site as `{"start": date, "nights": length}` under "sites"
+    and the number of sites per start date under "sites_by_start_date".
+    """
     availabilities_by_park_id = {}
     has_availabilities = False
     for park_id, info in info_by_park_id.items():
         current, _, available_dates_by_site_id, _ = info
-        if current:
+        if current and compact_nights:
             has_availabilities = True
-            availabilities_by_park_id[park_id] = available_dates_by_site_id
+            availabilities_by_park_id[park_id] = {
+                "sites": {
+                    site_id: [
+                        {
+                            "start": run["start"].isoformat(),
+                            "nights": (run["end"] - run["start"]).days,
+                        }
+                        for run in runs
+                    ]
+                    for site_id, runs in available_dates_by_site_id.items()
+                },
+                "sites_by_start_date": {
+                    day.isoformat(): sites
+                    for day, sites in count_sites_by_start_date(
+                        available_dates_by_site_id, compact_nights
+                    ).items()
+                },
+            }
+        elif current:
+            has_availabilities = True
+            availabilities_by_park_id[park_id] = {
+                site_id: [
+                    {
+                        "start": dates["start"].isoformat(),
+                        "end": dates["end"].isoformat(),
+                    }
+                    for dates in ranges
+                ]
+                for site_id, ranges in available_dates_by_site_id.items()
+            }
 
-    return json.dumps(availabilities_by_park_id), has_availabilities
+    return availabilities_by_park_id, has_availabilities
+
+
+def compact_nights(args, nights, result):
+    """
+    The `compact_nights` to pass to the output functions for a search of
+    `nights` nights, i.e. None unless `--compact` was given.
+    """
+    if not args.compact:
+        return None
+    return resolve_nights(nights, (result.end_date - result.start_date).days)
+
+
+def generate_output_by_nights(results_by_nights, args):
+    """
+    The output of a search for several night counts: the usual output of
+    each count, in a JSON object keyed by night count with `--json-output`
+    or after a heading per count otherwise.
+    """
+    if args.json_output:
+        availabilities_by_nights, has_availabilities = json_availabilities_by_nights(
+            results_by_nights, args
+        )
+        return json.dumps(availabilities_by_nights), has_availabilities
+    return human_output_by_nights(results_by_nights, args)
+
+
+def json_availabilities_by_nights(results_by_nights, args):
+    has_availabilities = False
+    availabilities_by_nights = {}
+    for nights, result in results_by_nights.items():
+        availabilities, has = json_availabilities(
+            result.parks, compact_nights(args, nights, result)
+        )
+        availabilities_by_nights[nights] = availabilities
+        has_availabilities = has_availabilities or has
+    return availabilities_by_nights, has_availabilities
+
+
+def human_output_by_nights(results_by_nights, args):
+    has_availabilities = False
+    out = []
+    for nights, result in results_by_nights.items():
+        output, has = generate_human_output(
+            result.parks,
+            result.start_date,
+            result.end_date,
+            args.show_campsite_info,
+            compact_nights(args, nights, result),
+        )
+        out.append("{} night(s):\n{}".format(nights, output))
+        has_availabilities = has_availabilities or has
+    return "\n\n".join(out), has_availabilities
+
+
+def generate_output_by_windows(results_by_window, args):
+    """
+    The output of a search over several date windows: the output of each
+    window, in a JSON object keyed by "start/end" with `--json-output` or
+    after a heading per window otherwise.
+    """
+    has_availabilities = False
+    if args.json_output:
+        availabilities_by_window = {}
+        for (start_date, end_date), result in results_by_window.items():
+            if is_night_counts(args.nights):
+                availabilities, has = json_availabilities_by_nights(result, args)
+            else:
+                availabilities, has = json_availabilities(
+                    result.parks, compact_nights(args, args.nights, result)
+                )
+            key = "{}/{}".format(start_date.date(), end_date.date())
+            availabilities_by_window[key] = availabilities
+            has_availabilities = has_availabilities or has
+        return json.dumps(availabilities_by_window), has_availabilities
+
+    out = []
+    for (start_date, end_date), result in results_by_window.items():
+        if is_night_counts(args.nights):
+            output, has = human_output_by_nights(result, args)
+        else:
+            output, has = generate_human_output(
+                result.parks,
+                result.start_date,
+                result.end_date,
+                args.show_campsite_info,
+                compact_nights(args, args.nights, result),
+            )
+        out.append("{} -> {}:\n{}".format(start_date.date(), end_date.date(), output))
+        has_availabilities = has_availabilities or has
+    return "\n\n".join(out), has_availabilities
 
 
 def remove_comments(lines: List[str]) -> List[str]:
@@ -286,38 +931,248 @@ def remove_comments(lines: List[str]) -> List[str]:
     return new_lines
 
 
-def main(parks, json_output=False):
-    excluded_site_ids = []
+def load_exclusion_file(path):
+    """
+    Reads the campsites to exclude, one campsite ID or range of IDs per
+    line, optionally scoped to a park (see `SiteExclusions.parse`).
+    """
+    with open(path, "r") as f:
+        excluded_site_ids = [l.strip() for l in f.readlines()]
+    return SiteExclusions.parse(remove_comments(excluded_site_ids))
 
-    if args.exclusion_file:
-        with open(args.exclusion_file, "r") as f:
-            excluded_site_ids = f.readlines()
-            excluded_site_ids = [l.strip() for l in excluded_site_ids]
-            excluded_site_ids = remove_comments(excluded_site_ids)
-
-    info_by_park_id = {}
-    for park_id in parks:
-        info_by_park_id[park_id] = check_park(
-            park_id,
-            args.start_date,
-            args.end_date,
-            args.campsite_type,
-            args.campsite_ids,
-            nights=args.nights,
-            weekends_only=args.weekends_only,
-            excluded_site_ids=excluded_site_ids,
+
+def search(
+    parks,
+    start_date,
+    end_date,
+    campsite_type=None,
+    campsite_ids=(),
+    nights=None,
+    weekends_only=False,
+    excluded_site_ids=(),
+    max_concurrency=1,
+    parallel_parks=1,
+    prefilter=False,
+    engine="bitset",
+    compact=False,
+    windows=None,
+    on_result=None,
+):
+    """
+    Checks the availability of every park in `parks` between `start_date`
+    and `end_date` (datetimes or "YYYY-MM-DD" strings) and returns a
+    SearchResult. This is everything `python camping.py` does short of
+    printing, for callers that want to search in-process.
+
+    `on_result(park_id, park_availability)` is called as soon as each park is
+    done, which with `parallel_parks` may be out of order; the returned
+    SearchResult always follows the order of `parks`.
+
+    `nights` may be a collection of night counts (e.g. `range(2, 5)`) to
+    search for stays of any of those lengths with one download per park.
+    The result is then `{nights: SearchResult}`, and `on_result` gets
+    `{nights: park_availability}`.
+
+    `windows` may be a list of (start_date, end_date) pairs to search
+    instead of a single range; each month is then downloaded once for all
+    windows and the result is `{(start_date, end_date): result}` in the
+    order of `windows`. `start_date` and `end_date` may be None; either way
+    they are widened to the span of the windows.
+    """
+    if windows:
+        windows = [
+            (formatter.parse_date(start), formatter.parse_date(end))
+            for start, end in windows
+        ]
+        start_date, end_date = window_span(
+            windows,
+            formatter.parse_date(start_date) if start_date else None,
+            formatter.parse_date(end_date) if end_date else None,
+        )
+    start_date = formatter.parse_date(start_date)
+    end_date = formatter.parse_date(end_date)
+
+    # Fetch the names of all parks missing from the metadata cache up front.
+    RecreationClient.warm_metadata_cache(
+        parks, max_concurrency=max_concurrency * parallel_parks
+    )
+
+    # Ask for the availability counts of all parks in as few requests as
+    # possible, so parks without availability can be skipped.
+    availability_counts = None
+    if prefilter and not windows and can_prefilter(start_date, end_date, nights):
+        availability_counts = RecreationClient.get_availability_counts(
+            parks, start_date, end_date
         )
 
-    if json_output:
-        output, has_availabilities = generate_json_output(info_by_park_id)
+    # Keep the order of `parks` in the output even when parks finish out of
+    # order.
+    info_by_park_id = dict.fromkeys(parks)
+    for park_id, info in check_parks(
+        parks,
+        start_date,
+        end_date,
+        campsite_type,
+        campsite_ids,
+        nights=nights,
+        weekends_only=weekends_only,
+        excluded_site_ids=excluded_site_ids,
+        max_concurrency=max_concurrency,
+        parallel_parks=parallel_parks,
+        prefilter=prefilter,
+        availability_counts=availability_counts,
+        engine=engine,
+        compact=compact,
+        windows=windows or None,
+    ):
+        info_by_park_id[park_id] = info
+        if on_result is not None:
+            on_result(park_id, info)
+
+    if windows:
+        return {
+            window: search_result(
+                window[0],
+                window[1],
+                {park_id: info[window] for park_id, info in info_by_park_id.items()},
+                nights,
+            )
+            for window in windows
+        }
+    return search_result(start_date, end_date, info_by_park_id, nights)
+
+
+def search_result(start_date, end_date, info_by_park_id, nights):
+    """
+    The SearchResult of `search`, or `{nights: SearchResult}` if `nights` is
+    a collection of night counts.
+    """
+    if is_night_counts(nights):
+        return {
+            n: SearchResult(
+                start_date,
+                end_date,
+                {park_id: info[n] for park_id, info in info_by_park_id.items()},
+            )
+            for n in nights
+        }
+    return SearchResult(start_date, end_date, info_by_park_id)
+
+
+def configure_client(args):
+    """
+    Applies the connection, retry, rate limit and cache options of the
+    command line to RecreationClient.
+    """
+    RecreationClient.configure_session(
+        pool_maxsize=args.pool_size
+        or max(
+            RecreationClient.pool_maxsize,
+            args.max_concurrency * args.parallel_parks,
+        ),
+        keep_alive=not args.no_keep_alive,
+    )
+    RecreationClient.configure_retries(
+        max_retries=args.max_retries, budget=args.retry_budget
+    )
+    configure_rate_limits(args.rate_limit)
+    RecreationClient.configure_cache(
+        args.cache_ttl, path=args.cache_file, max_entries=args.cache_size
+    )
+    RecreationClient.configure_metadata_cache(
+        args.metadata_cache_ttl, path=args.cache_file
+    )
+    configure_memo(args.memo_size)
+
+
+def configure_rate_limits(rate_limits):
+    """
+    Applies `(endpoint, rate)` pairs as parsed from `--rate-limit` to
+    RecreationClient; an endpoint of None limits every endpoint.
+    """
+    for endpoint, rate in rate_limits:
+        for name in [endpoint] if endpoint else RecreationClient.ENDPOINTS:
+            RecreationClient.configure_rate_limit(name, rate)
+
+
+def main(args):
+    excluded_site_ids = []
+    if args.exclusion_file:
+        excluded_site_ids = load_exclusion_file(args.exclusion_file)
+
+    on_result = None
+    if args.parallel_parks > 1:
+        # Stream progress on stderr so stdout stays parseable.
+        def on_result(park_id, info):
+            if args.windows:
+                for (start_date, end_date), window_info in info.items():
+                    print(
+                        "{} -> {}:".format(start_date.date(), end_date.date()),
+                        file=sys.stderr,
+                    )
+                    print_park_summary(park_id, window_info)
+                return
+            print_park_summary(park_id, info)
+
+        def print_park_summary(park_id, info):
+            if is_night_counts(args.nights):
+                summary = "\n".join(
+                    "{} night(s): {}".format(
+                        n, generate_park_summary(park_id, info[n])
+                    )
+                    for n in args.nights
+                )
+            else:
+                summary = generate_park_summary(park_id, info)
+            print(summary, file=sys.stderr, flush=True)
+
+    result = search(
+        args.parks,
+        args.start_date,
+        args.end_date,
+        args.campsite_type,
+        args.campsite_ids,
+        nights=args.nights,
+        weekends_only=args.weekends_only,
+        excluded_site_ids=excluded_site_ids,
+        max_concurrency=args.max_concurrency,
+        parallel_parks=args.parallel_parks,
+        prefilter=args.prefilter,
+        engine=args.engine,
+        compact=args.compact,
+        windows=args.windows,
+        on_result=on_result,
+    )
+
+    if args.windows:
+        output, has_availabilities = generate_output_by_windows(result, args)
+    elif is_night_counts(args.nights):
+        output, has_availabilities = generate_output_by_nights(result, args)
+    elif args.json_output:
+        output, has_availabilities = generate_json_output(
+            result.parks, compact_nights(args, args.nights, result)
+        )
     else:
         output, has_availabilities = generate_human_output(
-            info_by_park_id,
-            args.start_date,
-            args.end_date,
+            result.parks,
+            result.start_date,
+            result.end_date,
             args.show_campsite_info,
+            compact_nights(args, args.nights, result),
         )
     print(output)
+    LOG.debug(
+        "Connection stats: {}".format(RecreationClient.get_connection_stats())
+    )
+    LOG.debug("Cache stats: {}".format(RecreationClient.get_cache_stats()))
+    LOG.debug("Memo stats: {}".format(get_memo_stats()))
+    LOG.debug("Retry stats: {}".format(RecreationClient.get_retry_stats()))
+    LOG.debug(
+        "Coalescing stats: {}".format(RecreationClient.get_coalescing_stats())
+    )
+    LOG.debug(
+        "Rate limit stats: {}".format(RecreationClient.get_rate_limit_stats())
+    )
     return has_availabilities
 
 
@@ -328,4 +1183,5 @@ if __name__ == "__main__":
     if args.debug:
         LOG.setLevel(logging.DEBUG)
 
-    main(args.parks, json_output=args.json_output)
+    configure_client(args)
+    main(args)
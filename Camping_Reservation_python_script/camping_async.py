@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+"""
+asyncio versions of the fetching half of camping.py, for callers that want a
+single event loop to drive many parks and months at once. Everything after
+the fetch (filtering, consecutive nights, output) is shared with camping.py.
+"""
+
+import camping
+from clients.async_recreation_client import (
+    AsyncRecreationClient,
+    gather_or_cancel,
+)
+from utils import day_calendar
+from utils.site_filter import excluded_for_park
+
+
+async def get_park_information(
+    client, park_id, start_date, end_date, campsite_type=None, campsite_ids=(), excluded_site_ids=[],
+):
+    """
+    Same as `camping.get_park_information`, but all months are requested at
+    once through `client`, an AsyncRecreationClient.
+    """
+    months = camping.get_months(start_date, end_date)
+    api_data = await gather_or_cancel(
+        *(client.get_availability(park_id, month_date) for month_date in months)
+    )
+    return camping.collapse_park_information(
+        api_data,
+        day_calendar.get_calendar(start_date, end_date),
+        campsite_type,
+        campsite_ids,
+        excluded_for_park(excluded_site_ids, park_id),
+    )
+
+
+async def check_park(
+    client, park_id, start_date, end_date, campsite_type, campsite_ids=(), nights=None, weekends_only=False, excluded_site_ids=[], engine="bitset", compact=False,
+):
+    park_information, park_name = await gather_or_cancel(
+        get_park_information(
+            client, park_id, start_date, end_date, campsite_type, campsite_ids, excluded_site_ids=excluded_site_ids,
+        ),
+        client.get_park_name(park_id),
+    )
+    camping.log_park_information(park_id, park_information)
+    return camping.park_availability(
+        park_information, park_name, start_date, end_date, nights, weekends_only, engine, compact,
+    )
+
+
+async def check_parks(client, parks, *check_park_args, **check_park_kwargs):
+    """
+    Checks every park concurrently and returns `{park_id: info}` in the order
+    of `parks`, like `camping.search`. If any park fails, the
+    requests still in flight for the other parks are cancelled.
+    """
+    parks = list(dict.fromkeys(parks))
+    infos = await gather_or_cancel(
+        *(
+            check_park(client, park_id, *check_park_args, **check_park_kwargs)
+            for park_id in parks
+        )
+    )
+    return dict(zip(parks, infos))
+
+
+async def search(parks, *check_park_args, limit=100, limit_per_host=20, **check_park_kwargs):
+    """
+    Opens an AsyncRecreationClient for the duration of one `check_parks` run.
+    """
+    async with AsyncRecreationClient(
+        limit=limit, limit_per_host=limit_per_host
+    ) as client:
+        return await check_parks(
+            client, parks, *check_park_args, **check_park_kwargs
+        )
@@ -1,108 +1,144 @@
-import subprocess
 import argparse
+import logging
 import time
 from datetime import datetime
 
+import camping
+import camping_wrapper
+from clients.recreation_client import RecreationClient
+from utils.camping_argparser import CampingArgumentParser
+from utils.tier_rules import TierRules
+
 def run_camping_wrapper(args):
     """
-    Runs camping_wrapper.py with the given arguments and returns the output.
+    Runs the camping_wrapper.py pipeline in-process with the given arguments
+    and returns its Classification. With `--format ndjson` the records of
+    each park are written as soon as the park is done. Each call starts
+    with a fresh retry budget and logs the incremental stats at debug level.
     """
-    command = [
-        "python", "camping_wrapper.py",
-        "--start-date", args.start_date,
-        "--end-date", args.end_date,
-        "--parks", *args.parks,
-        "--nights", str(args.nights),
-        "--show-campsite-info"
-    ]
-
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"Error running camping_wrapper.py: {result.stderr}")
-    
-    return result.stdout
+    on_park = None
+    if args.format == "ndjson":
+        checked_at = datetime.now().isoformat(timespec="seconds")
+
+        def on_park(park):
+            camping_wrapper.write_ndjson(
+                dict(record, checked_at=checked_at)
+                for record in camping_wrapper.ndjson_records(park)
+            )
+
+    # Every check gets the whole retry budget.
+    RecreationClient.reset_retry_budget()
+    rules = camping_wrapper.DEFAULT_TIER_RULES
+    if args.tier_rules:
+        rules = TierRules.from_file(args.tier_rules)
+    classification = camping_wrapper.search_and_filter(
+        args.start_date, args.end_date, args.parks, args.nights, show_campsite_info=True, on_park=on_park, rules=rules
+    )
+    incremental_stats = camping.get_incremental_stats()
+    if incremental_stats is not None:
+        camping.LOG.debug(f"Incremental stats: {incremental_stats}")
+    return classification
 
-def parse_results(output):
-    """
-    Parses the output of camping_wrapper.py to create a structured result.
-    Returns a dictionary of sections (priority, regular, ignored) with their date ranges and site counts.
-    """
-    results = {"priority": {}, "regular": {}, "ignored": {}}
-    lines = output.splitlines()
-    current_section = None
-
-    for line in lines:
-        if "**Priority Results:**" in line:
-            current_section = "priority"
-        elif "**Regular Results:**" in line:
-            current_section = "regular"
-        elif "**Ignored Results:**" in line:
-            current_section = "ignored"
-        elif current_section and " --> " in line:
-            date_range, site_info = line.split(" --> ")
-            site_count = int(site_info.split(" site(s)")[0].strip())
-            results[current_section][date_range] = site_count
-
-    return results
-
-def filter_results_by_type(results, types):
+def filter_results_by_type(classification, types):
     """
     Filters results by the specified types (priority, regular, ignored).
+    Returns a dictionary of date ranges and their site counts.
     """
-    filtered_results = {}
-    for result_type in types:
-        filtered_results.update(results.get(result_type, {}))
-    return filtered_results
+    return classification.by_tier(types)
 
-def detect_changes(old_results, new_results):
+def find_changes(old_results, new_results):
     """
-    Detects changes between the old and new results.
-    Returns a list of changes and a boolean indicating if changes occurred.
+    Compares the old and new results and returns `(change, date_range,
+    site_count)` tuples, where change is "new" for date ranges that became
+    available and "removed" for those that no longer are.
     """
     changes = []
-    all_keys = set(old_results.keys()).union(new_results.keys())
-
-    for key in all_keys:
+    for key in dict.fromkeys([*old_results, *new_results]):
         old_count = old_results.get(key, 0)
         new_count = new_results.get(key, 0)
 
         if old_count == 0 and new_count > 0:
-            changes.append(f"🟢 New availability: {key} --> {new_count} site(s) available")
+            changes.append(("new", key, new_count))
         elif old_count > 0 and new_count == 0:
+            changes.append(("removed", key, 0))
+
+    return changes
+
+def detect_changes(old_results, new_results):
+    """
+    Detects changes between the old and new results.
+    Returns a list of changes and a boolean indicating if changes occurred.
+    """
+    changes = []
+    for change, key, site_count in find_changes(old_results, new_results):
+        if change == "new":
+            changes.append(f"🟢 New availability: {key} --> {site_count} site(s) available")
+        else:
             changes.append(f"🔴 No longer available: {key}")
 
     return changes, bool(changes)
 
+def change_records(old_results, new_results):
+    """
+    The changes between the old and new results as NDJSON records.
+    """
+    checked_at = datetime.now().isoformat(timespec="seconds")
+    for change, date_range, site_count in find_changes(old_results, new_results):
+        yield {
+            "type": "change",
+            "change": change,
+            "start": date_range.start.isoformat(),
+            "end": date_range.end.isoformat(),
+            "nights": date_range.nights,
+            "site_count": site_count,
+            "checked_at": checked_at,
+        }
+
 def camping_notification(args):
     """
     Main function to run camping_wrapper.py periodically and detect changes.
     """
+    ndjson = args.format == "ndjson"
+
+    def say(message):
+        # Progress messages would break up the NDJSON stream.
+        if not ndjson:
+            print(message)
+
+    def report_error(e):
+        if ndjson:
+            camping_wrapper.write_ndjson([{"type": "error", "error": str(e)}])
+        else:
+            print(f"Error: {e}")
+
     if args.frequency == 0:
-        print("Running one-time check...")
+        say("Running one-time check...")
     else:
-        print(f"Starting camping notifications with frequency: {args.frequency} minute(s)")
+        say(f"Starting camping notifications with frequency: {args.frequency} minute(s)")
     
-    print(f"Filtering results: {', '.join(args.filters)}")
+    say(f"Filtering results: {', '.join(args.filters)}")
 
+    # Nothing to compare against if the first check fails.
+    filtered_results = {}
     try:
-        print(f"\n[{datetime.now()}] Checking campsite availability...")
+        say(f"\n[{datetime.now()}] Checking campsite availability...")
         try:
-            output = run_camping_wrapper(args)
-            parsed_results = parse_results(output)
-            filtered_results = filter_results_by_type(parsed_results, args.filters)
+            classification = run_camping_wrapper(args)
+            filtered_results = filter_results_by_type(classification, args.filters)
 
-            print("\n=== Full Results for Reference ===")
-            print(output)
+            if not ndjson:
+                print("\n=== Full Results for Reference ===")
+                print(camping_wrapper.format_results(classification))
 
             # If frequency is 0, exit immediately after printing results
             if args.frequency == 0:
                 return
 
-        except RuntimeError as e:
-            print(f"Error: {e}")
+        except Exception as e:
+            report_error(e)
             if args.frequency == 0:
                 return
-            print("Skipping this check. Retaining previous results for future comparisons.")
+            say("Skipping this check. Retaining previous results for future comparisons.")
 
         # Only continue with loop if frequency > 0
         if args.frequency > 0:
@@ -110,27 +146,32 @@ def camping_notification(args):
             while True:
                 time.sleep(args.frequency * 60)
                 try:
-                    output = run_camping_wrapper(args)
-                    parsed_results = parse_results(output)
-                    filtered_results = filter_results_by_type(parsed_results, args.filters)
-
-                    changes, has_changes = detect_changes(old_results, filtered_results)
-                    if has_changes:
-                        print("\n=== Changes Detected ===")
-                        for change in changes:
-                            print(change)
-
-                    print("\n=== Full Results for Reference ===")
-                    print(output)
+                    classification = run_camping_wrapper(args)
+                    filtered_results = filter_results_by_type(classification, args.filters)
+
+                    if ndjson:
+                        camping_wrapper.write_ndjson(
+                            change_records(old_results, filtered_results)
+                        )
+                    else:
+                        changes, has_changes = detect_changes(old_results, filtered_results)
+                        if has_changes:
+                            print("\n=== Changes Detected ===")
+                            for change in changes:
+                                print(change)
+
+                    if not ndjson:
+                        print("\n=== Full Results for Reference ===")
+                        print(camping_wrapper.format_results(classification))
 
                     old_results = filtered_results
 
-                except RuntimeError as e:
-                    print(f"Error: {e}")
-                    print("Skipping this check. Retaining previous results for future comparisons.")
+                except Exception as e:
+                    report_error(e)
+                    say("Skipping this check. Retaining previous results for future comparisons.")
 
     except KeyboardInterrupt:
-        print("\nExiting. Goodbye!")
+        say("\nExiting. Goodbye!")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Camping Notification Wrapper")
@@ -139,6 +180,8 @@ if __name__ == "__main__":
     parser.add_argument("--parks", required=True, nargs="+", help="List of park IDs")
     parser.add_argument("--nights", type=int, required=True, help="Minimum number of nights required")
     parser.add_argument("--frequency", type=int, default=30, help="Frequency to check in minutes (default: 30, 0 for one-time check)")
+    parser.add_argument("--cache-ttl", type=int, default=0, help="Reuse availability fetched in the last N seconds, e.g. by other searches (default: 0, no caching)")
+    parser.add_argument("--format", choices=["human", "ndjson"], default="human", help="Output human text, or one JSON record per park, tier and date range as soon as each park is done, followed by change records (default: human)")
     parser.add_argument(
         "--filters",
         nargs="+",
@@ -146,8 +189,21 @@ if __name__ == "__main__":
         default=["priority", "regular", "ignored"],
         help="Specify which result types to include in changes detected (default: all types)."
     )
+    parser.add_argument("--metadata-cache-ttl", type=int, default=604800, help="Reuse campground names fetched in the last N seconds, e.g. by earlier checks (default: 604800, a week; 0 disables)")
+    parser.add_argument("--memo-size", type=int, default=128, help="Remember the last N availability results so checks finding unchanged availability skip the evaluation (default: 128, 0 disables)")
+    parser.add_argument("--no-incremental", action="store_true", help="Evaluate every site on every check instead of only the sites whose availability changed since the previous check")
+    parser.add_argument("--debug", "-d", action="store_true", help="Debug log level, e.g. to see how much each check reuses from the previous one")
+    parser.add_argument("--tier-rules", help="JSON file of rules sorting date ranges into priority, regular and ignored (default: the weekend rules of utils/tier_rules.py)")
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="[ENDPOINT=]RATE", type=CampingArgumentParser.TypeConverter.rate_limit, help="Maximum requests per second to recreation.gov, shared by every process on this machine. Either one rate for all endpoints or e.g. availability=2 (repeat the flag). Endpoints are availability, campground and search.")
 
     args = parser.parse_args()
+    RecreationClient.configure_cache(args.cache_ttl)
+    RecreationClient.configure_metadata_cache(args.metadata_cache_ttl)
+    camping.configure_rate_limits(args.rate_limit)
+    camping.configure_memo(args.memo_size)
+    camping.configure_incremental(not args.no_incremental)
+    if args.debug:
+        camping.LOG.setLevel(logging.DEBUG)
 
     camping_notification(args)
 
@@ -1,158 +1,176 @@
-import subprocess
 import argparse
-from datetime import datetime, timedelta
-
-def run_camping_script(args):
-    # Prepare the command
-    command = [
-        "python", "camping.py",
-        "--start-date", args.start_date,
-        "--end-date", args.end_date,
-        "--parks", *args.parks,
-        "--nights", str(args.nights),
-    ]
-    if args.show_campsite_info:
-        command.append("--show-campsite-info")
-    
-    # Run the script
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"Error running camping.py: {result.stderr}")
-    
-    return result.stdout
-
-def parse_camping_output(output):
-    # Parse the output of camping.py
-    parsed_data = {}
-    lines = output.splitlines()
-    current_park = None
-    for line in lines:
-        line = line.strip()
-        if line.startswith("🏕"):
-            park_info = line.split(":")[0]
-            current_park = park_info.split("(")[0].strip()
-            parsed_data[current_park] = {}
-        elif line.startswith("* Site"):
-            site_id = line.split()[2]
-            parsed_data[current_park][site_id] = []
-        elif line.startswith("* 202"):
-            date_range = line.strip("* ").split(" -> ")
-            parsed_data[current_park][site_id].append(tuple(date_range))
-    return parsed_data
-
-def filter_by_days(parsed_data, min_nights):
-    priority_results = {}
-    regular_results = {}
-    ignored_results = {}
-
-    for park, sites in parsed_data.items():
-        park_priority = {}
-        park_regular = {}
-        park_ignored = {}
-        for site_id, date_ranges in sites.items():
-            for date_range in date_ranges:
-                start_date = datetime.strptime(date_range[0], "%Y-%m-%d")
-                end_date = datetime.strptime(date_range[1], "%Y-%m-%d")
-                num_nights = (end_date - start_date).days
-
-                range_key = format_date_range(date_range[0], date_range[1])
-
-                if num_nights < min_nights:
-                    continue
-
-                # Logic for 1-night stays (no changes)
-                if min_nights == 1:
-                    if start_date.weekday() in [4, 5]:  # Friday or Saturday
-                        if range_key not in park_priority:
-                            park_priority[range_key] = 0
-                        park_priority[range_key] += 1
-                    elif start_date.weekday() in [3, 6]:  # Thursday or Sunday
-                        if range_key not in park_regular:
-                            park_regular[range_key] = 0
-                        park_regular[range_key] += 1
-                    else:
-                        if range_key not in park_ignored:
-                            park_ignored[range_key] = 0
-                        park_ignored[range_key] += 1
-
-                # Logic for 2-night stays (no changes)
-                elif min_nights == 2:
-                    if start_date.weekday() == 4 and (start_date + timedelta(days=1)).weekday() == 5:  # Fri and Sat
-                        if range_key not in park_priority:
-                            park_priority[range_key] = 0
-                        park_priority[range_key] += 1
-                    elif (
-                        start_date.weekday() in [3, 4, 5, 6]
-                        and end_date.weekday() in [5, 6, 0]
-                    ):  # Thurs-Sun or ends on Mon
-                        if range_key not in park_regular:
-                            park_regular[range_key] = 0
-                        park_regular[range_key] += 1
-                    else:
-                        if range_key not in park_ignored:
-                            park_ignored[range_key] = 0
-                        park_ignored[range_key] += 1
-
-                # Logic for 3-night stays
-                elif min_nights == 3:
-                    if start_date.weekday() in [3, 4]:  # Thurs or Fri
-                        if range_key not in park_priority:
-                            park_priority[range_key] = 0
-                        park_priority[range_key] += 1
-                    else:
-                        if range_key not in park_ignored:
-                            park_ignored[range_key] = 0
-                        park_ignored[range_key] += 1
-
-                # Logic for 4-night stays
-                elif min_nights == 4:
-                    if start_date.weekday() == 3:  # Starts on Thurs
-                        if range_key not in park_priority:
-                            park_priority[range_key] = 0
-                        park_priority[range_key] += 1
-                    else:
-                        if range_key not in park_ignored:
-                            park_ignored[range_key] = 0
-                        park_ignored[range_key] += 1
-
-                # Logic for 5 or more nights (everything is priority)
-                else:
-                    if range_key not in park_priority:
-                        park_priority[range_key] = 0
-                    park_priority[range_key] += 1
-
-        priority_results[park] = park_priority
-        regular_results[park] = park_regular
-        ignored_results[park] = park_ignored
-
-    return priority_results, regular_results, ignored_results
-
-
-def format_date_range(start, end):
-    start_date = datetime.strptime(start, "%Y-%m-%d")
-    end_date = datetime.strptime(end, "%Y-%m-%d")
-    start_str = f"{start} ({start_date.strftime('%a')})"
-    end_str = f"{end} ({end_date.strftime('%a')})"
-    return f"{start_str} -> {end_str}"
-
-def display_results(priority_results, regular_results, ignored_results):
-    for park, date_ranges in priority_results.items():
-        print(f"🏕 {park}")
-        print("  **Priority Results:**")
-        for date_range, site_count in date_ranges.items():
-            print(f"  \033[1m{date_range} --> {site_count} site(s) available\033[0m")  # Bold text
-
-    for park, date_ranges in regular_results.items():
-        print(f"🏕 {park}")
-        print("  **Regular Results:**")
-        for date_range, site_count in date_ranges.items():
-            print(f"  {date_range} --> {site_count} site(s) available")
-
-    for park, date_ranges in ignored_results.items():
-        print(f"🏕 {park}")
-        print("  **Ignored Results:**")
-        for date_range, site_count in date_ranges.items():
-            print(f"  {date_range} --> {site_count} site(s) available")
+import json
+import sys
+
+import camping
+from clients.recreation_client import RecreationClient
+from enums.emoji import Emoji
+from models.classification import (
+    IGNORED,
+    PRIORITY,
+    REGULAR,
+    TIERS,
+    Classification,
+    DateRange,
+    ParkClassification,
+)
+from utils.camping_argparser import CampingArgumentParser
+from utils.tier_rules import TierRules
+
+DEFAULT_TIER_RULES = TierRules()
+
+
+def search_camping(start_date, end_date, parks, nights, show_campsite_info=True, on_park=None):
+    """
+    Runs the camping.py search in-process and returns `{park_id:
+    ParkAvailability}` for every park with availability. Site details are
+    only kept with `show_campsite_info`, like camping.py's human output.
+
+    `on_park(park_id, park_availability)` is called for each park with
+    availability as soon as it has been checked.
+    """
+    def strip(park):
+        if show_campsite_info:
+            return park
+        return park._replace(available_dates_by_site_id={})
+
+    def on_result(park_id, park):
+        if on_park is not None and park.current:
+            on_park(park_id, strip(park))
+
+    result = camping.search(
+        parks, start_date, end_date, nights=nights, on_result=on_result
+    )
+    return {
+        park_id: strip(park)
+        for park_id, park in result.available_parks.items()
+    }
+
+
+def search_and_filter(start_date, end_date, parks, nights, show_campsite_info=True, on_park=None, rules=DEFAULT_TIER_RULES):
+    """
+    The whole wrapper pipeline: search, then split the date ranges into
+    priority, regular and ignored results (see `filter_by_days`).
+
+    `on_park(park_classification)` is called for each park with availability
+    as soon as it has been checked and classified, so results can be written
+    out while later parks are still being fetched.
+    """
+    classified = {}
+    date_ranges = {}
+
+    def classify_and_report(park_id, park):
+        classified[park_id] = classify_park(park_id, park, nights, date_ranges, rules)
+        on_park(classified[park_id])
+
+    available_parks = search_camping(
+        start_date,
+        end_date,
+        parks,
+        nights,
+        show_campsite_info,
+        on_park=classify_and_report if on_park is not None else None,
+    )
+    if on_park is None:
+        return filter_by_days(available_parks, nights, rules)
+    return Classification(
+        nights, [classified[park_id] for park_id in available_parks]
+    )
+
+
+def classify_park(park_id, park, min_nights, date_ranges=None, rules=DEFAULT_TIER_RULES):
+    """
+    Splits the date ranges of one ParkAvailability into tiers (see
+    `TierRules.classify`) and counts the sites available for each range.
+    `date_ranges` can be shared between parks searched for the same
+    `min_nights` and `rules` so each distinct range is only classified once.
+    """
+    if date_ranges is None:
+        date_ranges = {}
+    table = rules.table(min_nights)
+    tiers = {PRIORITY: {}, REGULAR: {}, IGNORED: {}}
+    for dates in park.available_dates_by_site_id.values():
+        for stay in dates:
+            key = (stay["start"], stay["end"])
+            classified = date_ranges.get(key)
+            if classified is None:
+                date_range = DateRange(*key)
+                tier = None
+                if date_range.nights >= min_nights:
+                    tier = table[date_range.start.weekday() * 7 + date_range.end.weekday()]
+                classified = date_ranges[key] = (date_range, tier)
+            date_range, tier = classified
+            if tier is not None:
+                counts = tiers[tier]
+                counts[date_range] = counts.get(date_range, 0) + 1
+    return ParkClassification(park_id, park.park_name, **tiers)
+
+
+def filter_by_days(available_parks, min_nights, rules=DEFAULT_TIER_RULES):
+    """
+    Classifies every park of `{park_id: ParkAvailability}` (see
+    `classify_park`).
+    """
+    date_ranges = {}
+    return Classification(
+        min_nights,
+        [
+            classify_park(park_id, park, min_nights, date_ranges, rules)
+            for park_id, park in available_parks.items()
+        ],
+    )
+
+
+def format_results(classification):
+    lines = []
+    for tier, title in (
+        (PRIORITY, "Priority Results"),
+        (REGULAR, "Regular Results"),
+        (IGNORED, "Ignored Results"),
+    ):
+        for park in classification.parks:
+            lines.append(f"{Emoji.SUCCESS.value} {park.park_name}")
+            lines.append(f"  **{title}:**")
+            for date_range, site_count in park.tier(tier).items():
+                line = f"{date_range} --> {site_count} site(s) available"
+                if tier == PRIORITY:
+                    line = f"\033[1m{line}\033[0m"  # Bold text
+                lines.append(f"  {line}")
+    return "\n".join(lines)
+
+def ndjson_records(park):
+    """
+    Yields one JSON-serializable record per tier and date range of a
+    ParkClassification.
+    """
+    for tier in TIERS:
+        for date_range, site_count in park.tier(tier).items():
+            yield {
+                "type": "availability",
+                "park_id": park.park_id,
+                "park_name": park.park_name,
+                "tier": tier,
+                "start": date_range.start.isoformat(),
+                "end": date_range.end.isoformat(),
+                "nights": date_range.nights,
+                "site_count": site_count,
+            }
+
+
+def write_ndjson(records, stream=None):
+    """
+    Writes each record as one line of JSON and flushes right away, so the
+    reader gets it without waiting for the rest of the search.
+    """
+    stream = stream or sys.stdout
+    for record in records:
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    stream.flush()
+
+def display_results(classification):
+    output = format_results(classification)
+    if output:
+        print(output)
 
 if __name__ == "__main__":
     # Parse command-line arguments
@@ -162,15 +180,30 @@ if __name__ == "__main__":
     parser.add_argument("--parks", required=True, nargs="+", help="List of park IDs")
     parser.add_argument("--nights", type=int, required=True, help="Minimum number of nights required")
     parser.add_argument("--show-campsite-info", action="store_true", help="Show detailed campsite info")
+    parser.add_argument("--cache-ttl", type=int, default=0, help="Reuse availability fetched in the last N seconds (default: 0, no caching)")
+    parser.add_argument("--format", choices=["human", "ndjson"], default="human", help="Output human text, or one JSON record per park, tier and date range as soon as each park is done (default: human)")
+    parser.add_argument("--tier-rules", help="JSON file of rules sorting date ranges into priority, regular and ignored (default: the weekend rules of utils/tier_rules.py)")
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="[ENDPOINT=]RATE", type=CampingArgumentParser.TypeConverter.rate_limit, help="Maximum requests per second to recreation.gov, shared by every process on this machine. Either one rate for all endpoints or e.g. availability=2 (repeat the flag). Endpoints are availability, campground and search.")
 
     args = parser.parse_args()
-    
-    # Run camping.py and process its output
+    RecreationClient.configure_cache(args.cache_ttl)
+    camping.configure_rate_limits(args.rate_limit)
+    rules = TierRules.from_file(args.tier_rules) if args.tier_rules else DEFAULT_TIER_RULES
+
+    # Search and process the results
     try:
-        output = run_camping_script(args)
-        parsed_data = parse_camping_output(output)
-        priority_results, regular_results, ignored_results = filter_by_days(parsed_data, args.nights)
-        display_results(priority_results, regular_results, ignored_results)
+        if args.format == "ndjson":
+            search_and_filter(
+                args.start_date, args.end_date, args.parks, args.nights, args.show_campsite_info,
+                on_park=lambda park: write_ndjson(ndjson_records(park)), rules=rules,
+            )
+        else:
+            classification = search_and_filter(
+                args.start_date, args.end_date, args.parks, args.nights, args.show_campsite_info, rules=rules
+            )
+            display_results(classification)
     except Exception as e:
-        print(f"Error: {e}")
-
+        if args.format == "ndjson":
+            write_ndjson([{"type": "error", "error": str(e)}])
+        else:
+            print(f"Error: {e}")
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from clients.recreation_client import RecreationClient
+from clients.retry import RETRY_STATUS_CODES, RetryPolicy
+from utils import formatter
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncRecreationClient:
+    """
+    asyncio counterpart to RecreationClient, talking to the same endpoints.
+
+    Unlike RecreationClient this is an instance rather than a set of
+    classmethods, because an aiohttp session belongs to the event loop it was
+    created on. Use it as an async context manager so the connection pool is
+    closed with the loop:
+
+        async with AsyncRecreationClient() as client:
+            await client.get_park_name(park_id)
+
+    `limit` caps the total number of open connections and `limit_per_host`
+    the connections to any single host; requests beyond that wait for a free
+    connection instead of opening a new one. Cancelling the task awaiting a
+    request aborts the request and releases its connection.
+    """
+
+    AVAILABILITY_ENDPOINT = RecreationClient.AVAILABILITY_ENDPOINT
+    MAIN_PAGE_ENDPOINT = RecreationClient.MAIN_PAGE_ENDPOINT
+
+    def __init__(self, limit=100, limit_per_host=20, timeout=30, headers=None, retry_policy=None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = headers or RecreationClient.headers
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._session = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def open(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit, limit_per_host=self.limit_per_host
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get_availability(self, park_id, month_date):
+        params = {"start_date": formatter.format_date(month_date)}
+        LOG.debug(
+            "Querying for {} with these params: {}".format(park_id, params)
+        )
+        url = self.AVAILABILITY_ENDPOINT.format(park_id=park_id)
+        return await self._send_request(url, params)
+
+    async def get_park_name(self, park_id):
+        resp = await self._send_request(
+            self.MAIN_PAGE_ENDPOINT.format(park_id=park_id), {}
+        )
+        return resp["campground"]["facility_name"]
+
+    async def _send_request(self, url, params):
+        session = await self.open()
+        policy = self.retry_policy
+        attempt = 0
+        while True:
+            try:
+                async with session.get(url, params=params) as resp:
+                    if resp.status == 200:
+                        return await resp.json(content_type=None)
+                    retryable = resp.status in RETRY_STATUS_CODES
+                    if not (retryable and policy.should_retry(attempt)):
+                        raise RuntimeError(
+                            "failedRequest",
+                            "ERROR, {status_code} code received from {url}: {resp_text}".format(
+                                status_code=resp.status,
+                                url=url,
+                                resp_text=await resp.text(),
+                            ),
+                        )
+                    delay = policy.get_delay(
+                        attempt, resp.headers.get("Retry-After")
+                    )
+                    LOG.debug(
+                        "Retry {} for {} in {:.2f}s after a {} response".format(
+                            attempt + 1, url, delay, resp.status
+                        )
+                    )
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not policy.should_retry(attempt):
+                    raise
+                delay = policy.get_delay(attempt)
+                LOG.debug(
+                    "Retry {} for {} in {:.2f}s after {!r}".format(
+                        attempt + 1, url, delay, e
+                    )
+                )
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def gather_or_cancel(*aws):
+    """
+    Like asyncio.gather, but when one awaitable fails the others are
+    cancelled instead of being left running in the background.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
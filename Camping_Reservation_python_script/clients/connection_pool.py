@@ -0,0 +1,116 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class ConnectionStats:
+    """
+    Thread-safe counters for how many TCP connections were opened versus how
+    many requests went out over an already open (kept-alive) connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.requests = 0
+
+    def record_open(self):
+        with self._lock:
+            self.opened += 1
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def reused(self):
+        return max(self.requests - self.opened, 0)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "opened": self.opened,
+                "reused": max(self.requests - self.opened, 0),
+                "requests": self.requests,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.opened = 0
+            self.requests = 0
+
+
+def _counting_pool_class(base, stats):
+    # urllib3 reuses the same connection object when the server closed the
+    # socket, so count actual connects rather than created connections.
+    class CountingConnection(base.ConnectionCls):
+        def connect(self):
+            stats.record_open()
+            return super().connect()
+
+    class CountingConnectionPool(base):
+        ConnectionCls = CountingConnection
+
+    return CountingConnectionPool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter whose urllib3 pools report every new connection to a
+    ConnectionStats instance, so callers can see how often keep-alive saved
+    them a TCP+TLS handshake.
+    """
+
+    def __init__(self, stats=None, **kwargs):
+        self.stats = stats or ConnectionStats()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool_class(HTTPConnectionPool, self.stats),
+            "https": _counting_pool_class(HTTPSConnectionPool, self.stats),
+        }
+
+    def __setstate__(self, state):
+        # HTTPAdapter pickles its attributes; make sure stats come back too.
+        self.stats = state.pop("stats", None) or ConnectionStats()
+        super().__setstate__(state)
+
+    def send(self, request, **kwargs):
+        self.stats.record_request()
+        return super().send(request, **kwargs)
+
+
+def build_session(
+    pool_connections=10,
+    pool_maxsize=10,
+    pool_block=False,
+    keep_alive=True,
+    headers=None,
+    stats=None,
+):
+    """
+    Builds a requests.Session backed by a PooledHTTPAdapter.
+
+    `pool_connections` is the number of distinct hosts to keep pools for and
+    `pool_maxsize` the number of connections kept open per host, which should
+    be at least the number of threads sharing the session. With `keep_alive`
+    off every request asks the server to close the connection afterwards.
+    """
+    session = requests.Session()
+    adapter = PooledHTTPAdapter(
+        stats=stats,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        pool_block=pool_block,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if headers:
+        session.headers.update(headers)
+    if not keep_alive:
+        session.headers["Connection"] = "close"
+    return session
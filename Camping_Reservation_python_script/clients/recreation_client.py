@@ -1,9 +1,17 @@
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 import user_agent 
 
+from clients.connection_pool import ConnectionStats, build_session
+from clients.retry import RETRY_STATUS_CODES, RetryPolicy
 from utils import formatter
+from utils.rate_limiter import TokenBucket
+from utils.single_flight import SingleFlight
+from utils.sqlite_cache import SQLiteCache
 
 LOG = logging.getLogger(__name__)
 
@@ -15,34 +23,384 @@ class RecreationClient:
         BASE_URL + "/api/camps/availability/campground/{park_id}/month"
     )
     MAIN_PAGE_ENDPOINT = BASE_URL + "/api/camps/campgrounds/{park_id}"
+    SEARCH_ENDPOINT = BASE_URL + "/api/search"
+    # Parks per search request in `get_availability_counts`.
+    SEARCH_BATCH_SIZE = 50
 
     headers = {"User-Agent": user_agent.generate_user_agent() }
-    
+
+    # Connection pool settings, see `configure_session`.
+    pool_connections = 10
+    pool_maxsize = 10
+    pool_block = False
+    keep_alive = True
+    timeout = 30
+
+    connection_stats = ConnectionStats()
+    retry_policy = RetryPolicy()
+    # Token buckets by endpoint name, see `configure_rate_limit`.
+    ENDPOINTS = ("availability", "campground", "search")
+    rate_limiters = {}
+    # Set by `configure_cache` and `configure_metadata_cache`, disabled by
+    # default.
+    availability_cache = None
+    metadata_cache = None
+    # How long other processes wait for one that is fetching the same month.
+    lease_timeout = 30
+    availability_flight = SingleFlight()
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def configure_session(
+        cls,
+        pool_connections=None,
+        pool_maxsize=None,
+        pool_block=None,
+        keep_alive=None,
+        timeout=None,
+    ):
+        """
+        Changes the connection pool settings. The shared session is rebuilt
+        lazily on the next request so that the new settings take effect.
+        """
+        with cls._session_lock:
+            if pool_connections is not None:
+                cls.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                cls.pool_maxsize = pool_maxsize
+            if pool_block is not None:
+                cls.pool_block = pool_block
+            if keep_alive is not None:
+                cls.keep_alive = keep_alive
+            if timeout is not None:
+                cls.timeout = timeout
+            cls._close_session()
+
+    @classmethod
+    def configure_retries(
+        cls, max_retries=3, backoff_base=0.5, backoff_max=30, budget=20
+    ):
+        """
+        Replaces the retry policy (and resets its retry budget), see
+        `clients.retry.RetryPolicy`.
+        """
+        cls.retry_policy = RetryPolicy(
+            max_retries=max_retries,
+            backoff_base=backoff_base,
+            backoff_max=backoff_max,
+            budget=budget,
+        )
+
+    @classmethod
+    def reset_retry_budget(cls):
+        """
+        Resets the retry budget without changing the policy. Long-running
+        callers (a watcher's polling cycle, a web request) call this at the
+        start of each unit of work so the budget stays per run.
+        """
+        cls.retry_policy.reset()
+
+    @classmethod
+    def get_retry_stats(cls):
+        return cls.retry_policy.as_dict()
+
+    @classmethod
+    def configure_rate_limit(cls, endpoint, rate, capacity=None, path=None):
+        """
+        Limits requests to `endpoint` (one of ENDPOINTS) to `rate` per
+        second, with bursts of up to `capacity` requests. The bucket lives in
+        the SQLite file at `path`, so every process using the same file
+        shares the limit. A `rate` of 0 or None removes the limit.
+        """
+        if endpoint not in cls.ENDPOINTS:
+            raise ValueError(
+                "Unknown endpoint '{}', expected one of {}".format(
+                    endpoint, ", ".join(cls.ENDPOINTS)
+                )
+            )
+        limiter = cls.rate_limiters.pop(endpoint, None)
+        if limiter is not None:
+            limiter.close()
+        if rate:
+            kwargs = {"path": path} if path else {}
+            cls.rate_limiters[endpoint] = TokenBucket(
+                endpoint, rate, capacity=capacity, **kwargs
+            )
+
+    @classmethod
+    def get_rate_limit_stats(cls):
+        return {
+            endpoint: limiter.stats.as_dict()
+            for endpoint, limiter in cls.rate_limiters.items()
+        }
+
+    @classmethod
+    def get_session(cls):
+        """
+        Returns the requests.Session shared by every classmethod (and every
+        thread), creating it on first use.
+        """
+        session = cls._session
+        if session is not None:
+            return session
+        with cls._session_lock:
+            if cls._session is None:
+                cls._session = build_session(
+                    pool_connections=cls.pool_connections,
+                    pool_maxsize=cls.pool_maxsize,
+                    pool_block=cls.pool_block,
+                    keep_alive=cls.keep_alive,
+                    headers=cls.headers,
+                    stats=cls.connection_stats,
+                )
+            return cls._session
+
+    @classmethod
+    def close_session(cls):
+        with cls._session_lock:
+            cls._close_session()
+
+    @classmethod
+    def _close_session(cls):
+        if cls._session is not None:
+            cls._session.close()
+            cls._session = None
+
+    @classmethod
+    def get_connection_stats(cls):
+        return cls.connection_stats.as_dict()
+
+    @classmethod
+    def configure_cache(cls, ttl, path=None, max_entries=10000):
+        """
+        Caches availability responses per park and month for `ttl` seconds in
+        the SQLite file at `path`, which may be shared between processes. A
+        `ttl` of 0 or None turns the cache off.
+        """
+        if cls.availability_cache is not None:
+            cls.availability_cache.close()
+        cls.availability_cache = cls._build_cache(
+            "availability", ttl, path, max_entries
+        )
+
+    @classmethod
+    def configure_metadata_cache(cls, ttl, path=None, max_entries=10000):
+        """
+        Same as `configure_cache`, for the campground documents behind
+        `get_campground` and `get_park_name`. These hardly ever change, so a
+        TTL of days or weeks is fine.
+        """
+        if cls.metadata_cache is not None:
+            cls.metadata_cache.close()
+        cls.metadata_cache = cls._build_cache(
+            "metadata", ttl, path, max_entries
+        )
+
+    @classmethod
+    def _build_cache(cls, namespace, ttl, path, max_entries):
+        if not ttl:
+            return None
+        kwargs = {"path": path} if path else {}
+        return SQLiteCache(
+            namespace=namespace, ttl=ttl, max_entries=max_entries, **kwargs
+        )
+
+    @classmethod
+    def get_cache_stats(cls):
+        return {
+            name: cache.stats.as_dict() if cache is not None else None
+            for name, cache in (
+                ("availability", cls.availability_cache),
+                ("metadata", cls.metadata_cache),
+            )
+        }
+
     @classmethod
     def get_availability(cls, park_id, month_date):
+        """
+        Returns the availability of a park for the month of `month_date`.
+
+        Concurrent calls for the same park and month share one request: within
+        the process through `availability_flight`, and across processes
+        through a lease in the availability cache when it is enabled.
+        """
         params = {"start_date": formatter.format_date(month_date)}
-        LOG.debug(
-            "Querying for {} with these params: {}".format(park_id, params)
+        cache_key = "{}:{}".format(park_id, params["start_date"])
+        return cls.availability_flight.do(
+            cache_key, cls._get_availability, park_id, params, cache_key
         )
-        url = cls.AVAILABILITY_ENDPOINT.format(park_id=park_id)
-        resp = cls._send_request(url, params)
-        return resp
 
     @classmethod
-    def get_park_name(cls, park_id):
+    def _get_availability(cls, park_id, params, cache_key):
+        cache = cls.availability_cache
+        lease = None
+        if cache is not None:
+            resp = cache.get(cache_key)
+            if resp is not None:
+                LOG.debug(
+                    "Cache hit for {} with these params: {}".format(
+                        park_id, params
+                    )
+                )
+                return resp
+
+            lease = cache.acquire_lease(cache_key, cls.lease_timeout)
+            if lease is None:
+                LOG.debug(
+                    "Waiting for another process to fetch {} with these params: {}".format(
+                        park_id, params
+                    )
+                )
+                resp = cache.wait_for(cache_key, cls.lease_timeout)
+                if resp is not None:
+                    return resp
+
+        try:
+            LOG.debug(
+                "Querying for {} with these params: {}".format(park_id, params)
+            )
+            url = cls.AVAILABILITY_ENDPOINT.format(park_id=park_id)
+            resp = cls._send_request(url, params, endpoint="availability")
+            if cache is not None:
+                cache.set(cache_key, resp)
+            return resp
+        finally:
+            if lease is not None:
+                cache.release_lease(cache_key, lease)
+
+    @classmethod
+    def get_coalescing_stats(cls):
+        return cls.availability_flight.as_dict()
+
+    @classmethod
+    def get_availability_counts(cls, park_ids, start_date, end_date):
+        """
+        Asks the search endpoint how many sites of each park are available
+        between `start_date` and `end_date`, a single request per
+        SEARCH_BATCH_SIZE parks. Returns a dict from park ID (as a string) to
+        its `availability_counts`, e.g. {"Available": 27, "Reserved": 3}.
+        Parks the search doesn't return are left out.
+        """
+        counts_by_park_id = {}
+        park_ids = [str(park_id) for park_id in dict.fromkeys(park_ids)]
+        for i in range(0, len(park_ids), cls.SEARCH_BATCH_SIZE):
+            batch = park_ids[i : i + cls.SEARCH_BATCH_SIZE]
+            params = {
+                "fq": "asset_id:({})".format(" OR ".join(batch)),
+                "start": 0,
+                "size": len(batch),
+                "start_date": formatter.format_date(start_date),
+                "end_date": formatter.format_date(end_date),
+                "include_unavailable": "true",
+            }
+            LOG.debug("Searching availability counts: {}".format(params))
+            resp = cls._send_request(
+                cls.SEARCH_ENDPOINT, params, endpoint="search"
+            )
+            for result in resp.get("results") or []:
+                park_id = str(result.get("entity_id") or result.get("id"))
+                counts = result.get("availability_counts")
+                if park_id in batch and counts is not None:
+                    counts_by_park_id[park_id] = counts
+        return counts_by_park_id
+
+    @classmethod
+    def get_campground(cls, park_id):
+        """
+        Returns the campground document (name, type, location, ...) of a
+        park, from the metadata cache when possible.
+        """
+        cache = cls.metadata_cache
+        cache_key = str(park_id)
+        if cache is not None:
+            campground = cache.get(cache_key)
+            if campground is not None:
+                return campground
+
         resp = cls._send_request(
-            cls.MAIN_PAGE_ENDPOINT.format(park_id=park_id), {}
+            cls.MAIN_PAGE_ENDPOINT.format(park_id=park_id),
+            {},
+            endpoint="campground",
         )
-        return resp["campground"]["facility_name"]
+        campground = resp["campground"]
+        if cache is not None:
+            cache.set(cache_key, campground)
+        return campground
 
     @classmethod
-    def _send_request(cls, url, params):
-        resp = requests.get(url, params=params, headers=cls.headers)
-        if resp.status_code != 200:
-            raise RuntimeError(
-                "failedRequest",
-                "ERROR, {status_code} code received from {url}: {resp_text}".format(
-                    status_code=resp.status_code, url=url, resp_text=resp.text
-                ),
-            )
-        return resp.json()
+    def get_park_name(cls, park_id):
+        return cls.get_campground(park_id)["facility_name"]
+
+    @classmethod
+    def warm_metadata_cache(cls, park_ids, max_concurrency=4):
+        """
+        Fetches the campground document of every park in `park_ids` that is
+        not in the metadata cache yet. Returns how many were fetched.
+        """
+        cache = cls.metadata_cache
+        if cache is None:
+            return 0
+        missing = [
+            park_id
+            for park_id in dict.fromkeys(park_ids)
+            if cache.get(str(park_id)) is None
+        ]
+        if missing:
+            with ThreadPoolExecutor(
+                max_workers=min(max_concurrency, len(missing))
+            ) as executor:
+                list(executor.map(cls.get_campground, missing))
+        LOG.debug("Warmed metadata cache with {} park(s)".format(len(missing)))
+        return len(missing)
+
+    @classmethod
+    def _send_request(cls, url, params, endpoint=None):
+        """
+        Sends a GET request and returns the decoded JSON body. Connection
+        errors, timeouts and 429/5xx responses are retried according to
+        `retry_policy`; anything else that isn't a 200 fails right away.
+
+        Every attempt first takes a token from the rate limiter of
+        `endpoint`, if there is one.
+        """
+        policy = cls.retry_policy
+        limiter = cls.rate_limiters.get(endpoint)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                resp = cls.get_session().get(
+                    url, params=params, timeout=cls.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if not policy.should_retry(attempt):
+                    raise
+                delay = policy.get_delay(attempt)
+                LOG.debug(
+                    "Retry {} for {} in {:.2f}s after {!r}".format(
+                        attempt + 1, url, delay, e
+                    )
+                )
+            else:
+                if resp.status_code == 200:
+                    return resp.json()
+                retryable = resp.status_code in RETRY_STATUS_CODES
+                if not (retryable and policy.should_retry(attempt)):
+                    raise RuntimeError(
+                        "failedRequest",
+                        "ERROR, {status_code} code received from {url}: {resp_text}".format(
+                            status_code=resp.status_code, url=url, resp_text=resp.text
+                        ),
+                    )
+                delay = policy.get_delay(
+                    attempt, resp.headers.get("Retry-After")
+                )
+                LOG.debug(
+                    "Retry {} for {} in {:.2f}s after a {} response".format(
+                        attempt + 1, url, delay, resp.status_code
+                    )
+                )
+            time.sleep(delay)
+            attempt += 1
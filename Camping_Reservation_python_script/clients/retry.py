@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+class RetryPolicy:
+    """
+    Decides whether and how long to wait before retrying a failed request.
+
+    Delays grow exponentially from `backoff_base` up to `backoff_max` seconds
+    with full jitter, so that many clients failing at the same moment don't
+    retry in lockstep. A `Retry-After` header from the server is honored as a
+    lower bound, but never beyond `backoff_max`, so a server asking for hours
+    can't stall the run. `budget` caps the number of retries over the lifetime of the
+    policy (i.e. a run), so a struggling upstream can't cause a retry storm;
+    None means unlimited.
+    """
+
+    def __init__(self, max_retries=3, backoff_base=0.5, backoff_max=30, budget=20):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    def should_retry(self, attempt):
+        """
+        Returns True and spends one unit of the budget if attempt number
+        `attempt` (starting at 0) may be followed by a retry.
+        """
+        if attempt >= self.max_retries:
+            return False
+        with self._lock:
+            if self.budget is not None and self.retries >= self.budget:
+                self.budget_exhausted += 1
+                return False
+            self.retries += 1
+            return True
+
+    def reset(self):
+        """
+        Gives back the whole budget, for long-running processes where each
+        polling cycle or request counts as a run.
+        """
+        with self._lock:
+            self.retries = 0
+
+    def get_delay(self, attempt, retry_after=None):
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        )
+        retry_after = parse_retry_after(retry_after)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "budget": self.budget,
+                "budget_exhausted": self.budget_exhausted,
+            }
+
+
+def parse_retry_after(value):
+    """
+    Returns the number of seconds a `Retry-After` header asks us to wait, or
+    None if it is missing or can't be parsed. The header is either a number
+    of seconds or an HTTP date.
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
@@ -0,0 +1,79 @@
+from datetime import date, datetime
+from typing import Collection, Dict, List, NamedTuple, Optional, Union
+
+ParkId = Union[int, str]
+
+
+class ParkAvailability(NamedTuple):
+    """
+    The availability of one park, as returned by `camping.check_park`. It
+    unpacks like the `(current, maximum, available_dates_by_site_id,
+    park_name)` tuple the output functions expect.
+
+    `available_dates_by_site_id` maps each available campsite ID to a list
+    of `{"start": date, "end": date}` dicts of `datetime.date`s, where `end`
+    is the check-out day: one per stay, or with `compact` one per run of
+    free nights long enough for a stay.
+    """
+
+    current: int
+    maximum: int
+    available_dates_by_site_id: Dict[int, List[Dict[str, date]]]
+    park_name: str
+
+
+class SearchResult(NamedTuple):
+    """
+    The result of `camping.search`: the availability of every park, in the
+    order the parks were asked for.
+    """
+
+    start_date: datetime
+    end_date: datetime
+    parks: Dict[ParkId, ParkAvailability]
+
+    @property
+    def has_availabilities(self):
+        return any(park.current for park in self.parks.values())
+
+    @property
+    def available_parks(self):
+        return {
+            park_id: park
+            for park_id, park in self.parks.items()
+            if park.current
+        }
+
+
+class Query(NamedTuple):
+    """
+    One availability question for `camping.run_queries`: the arguments of
+    `camping.check_park` for a single park and date range.
+    """
+
+    park_id: ParkId
+    start_date: datetime
+    end_date: datetime
+    campsite_type: Optional[str] = None
+    campsite_ids: Collection[int] = ()
+    nights: Optional[int] = None
+    weekends_only: bool = False
+    excluded_site_ids: Collection[str] = ()
+    engine: str = "bitset"
+    compact: bool = False
+
+
+class BatchResult(NamedTuple):
+    """
+    The result of `camping.run_queries`: the availability for each query, in
+    the order of the queries, and how many park-months the queries asked
+    for against how many were downloaded.
+    """
+
+    results: List[ParkAvailability]
+    requested_months: int
+    fetched_months: int
+
+    @property
+    def saved_requests(self):
+        return self.requested_months - self.fetched_months
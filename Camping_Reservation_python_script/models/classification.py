@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List
+
+from models.availability import ParkId
+
+PRIORITY = "priority"
+REGULAR = "regular"
+IGNORED = "ignored"
+TIERS = (PRIORITY, REGULAR, IGNORED)
+
+
+@dataclass(frozen=True)
+class DateRange:
+    """
+    A stay checking in on `start` and checking out on `end`.
+    """
+
+    __slots__ = ("start", "end")
+    start: date
+    end: date
+
+    @property
+    def nights(self):
+        return (self.end - self.start).days
+
+    def __str__(self):
+        return f"{self.start} ({self.start:%a}) -> {self.end} ({self.end:%a})"
+
+
+@dataclass
+class ParkClassification:
+    """
+    The date ranges available at one park, split into tiers by
+    `camping_wrapper.filter_by_days`. Each tier maps a date range to the
+    number of campsites available for it.
+    """
+
+    __slots__ = ("park_id", "park_name", PRIORITY, REGULAR, IGNORED)
+    park_id: ParkId
+    park_name: str
+    priority: Dict[DateRange, int]
+    regular: Dict[DateRange, int]
+    ignored: Dict[DateRange, int]
+
+    def tier(self, name):
+        return getattr(self, name)
+
+
+@dataclass
+class Classification:
+    """
+    The result of `camping_wrapper.filter_by_days`, one entry per park with
+    availability, in search order.
+    """
+
+    __slots__ = ("min_nights", "parks")
+    min_nights: int
+    parks: List[ParkClassification]
+
+    def by_tier(self, tiers=TIERS):
+        """
+        Returns `{date_range: site_count}` for the given tiers across all
+        parks.
+        """
+        merged = {}
+        for tier in tiers:
+            for park in self.parks:
+                merged.update(park.tier(tier))
+        return merged
@@ -0,0 +1,102 @@
+import random
+import unittest
+from datetime import date, datetime, timedelta
+
+import camping
+from utils import availability_matrix
+from utils.availability_matrix import AvailabilityMatrix
+
+
+def random_park(sites, start, days, seed):
+    rng = random.Random(seed)
+    park_information = {}
+    for site in range(sites):
+        park_information[str(1000 + site)] = [
+            start.toordinal() + d for d in range(days) if rng.random() < 0.6
+        ]
+    return park_information
+
+
+class TestAvailabilityMatrix(unittest.TestCase):
+    def testRanges_FindsEveryStartOfConsecutiveNights(self):
+        matrix = AvailabilityMatrix(
+            {
+                "1": [
+                    date(2022, 6, 22).toordinal(),
+                    date(2022, 6, 23).toordinal(),
+                    date(2022, 6, 24).toordinal(),
+                    date(2022, 6, 26).toordinal(),
+                ]
+            },
+            datetime(2022, 6, 22),
+            datetime(2022, 6, 27),
+        )
+
+        self.assertEqual(matrix.masks, {"1": 0b10111})
+        self.assertEqual(
+            matrix.ranges("1", 2),
+            [
+                (date(2022, 6, 22), date(2022, 6, 24)),
+                (date(2022, 6, 23), date(2022, 6, 25)),
+            ],
+        )
+        self.assertEqual(matrix.ranges("1", 4), [])
+
+    def testGetNumAvailableSites_MatchesGroupbyEngine(self):
+        # Spans a month boundary, as collapsed park information does.
+        start = datetime(2022, 6, 10)
+        park_information = random_park(50, start - timedelta(days=5), 60, seed=1)
+        park_information["empty"] = []
+
+        for end_days in (1, 7, 31):
+            end = start + timedelta(days=end_days)
+            for nights in (None, 1, 2, 3, 5, 40):
+                for weekends_only in (False, True):
+                    args = (park_information, start, end)
+                    kwargs = dict(nights=nights, weekends_only=weekends_only)
+                    self.assertEqual(
+                        availability_matrix.get_num_available_sites(*args, **kwargs),
+                        camping.get_num_available_sites(*args, **kwargs),
+                        (end_days, nights, weekends_only),
+                    )
+
+    def testGetNumAvailableSites_ComputesEveryNightCountInOnePass(self):
+        start = datetime(2022, 6, 10)
+        end = start + timedelta(days=20)
+        park_information = random_park(30, start, 20, seed=2)
+
+        for engine in camping.AVAILABILITY_ENGINES.values():
+            by_nights = engine(park_information, start, end, nights=(1, 3, 50))
+
+            self.assertEqual([1, 3, 50], sorted(by_nights))
+            for nights, result in by_nights.items():
+                self.assertEqual(
+                    engine(park_information, start, end, nights=nights), result
+                )
+
+    def testGetNumAvailableSites_CompactRunsCoverTheSameStays(self):
+        start = datetime(2022, 6, 10)
+        end = start + timedelta(days=30)
+        park_information = random_park(40, start, 30, seed=3)
+
+        for nights in (1, 2, 4):
+            stays = camping.get_num_available_sites(
+                park_information, start, end, nights=nights
+            )
+            for engine in camping.AVAILABILITY_ENGINES.values():
+                current, maximum, runs_by_site_id = engine(
+                    park_information, start, end, nights=nights, compact=True
+                )
+                self.assertEqual((stays[0], stays[1]), (current, maximum))
+
+                expanded = {}
+                for site_id, runs in runs_by_site_id.items():
+                    expanded[site_id] = [
+                        {
+                            "start": run["start"] + timedelta(days=d),
+                            "end": run["start"] + timedelta(days=d + nights),
+                        }
+                        for run in runs
+                        for d in range((run["end"] - run["start"]).days - nights + 1)
+                    ]
+                self.assertEqual(stays[2], expanded)
@@ -0,0 +1,70 @@
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import camping
+from utils.availability_memo import AvailabilityMemo, digest_park_information
+
+
+def ordinals(*days):
+    return [date.fromisoformat(day).toordinal() for day in days]
+
+
+class TestAvailabilityMemo(unittest.TestCase):
+    def testDigest_DependsOnlyOnContent(self):
+        park_information = {"1": ordinals("2022-06-22"), "2": []}
+
+        self.assertEqual(
+            digest_park_information(park_information),
+            digest_park_information({"2": [], "1": ordinals("2022-06-22")}),
+        )
+        self.assertNotEqual(
+            digest_park_information(park_information),
+            digest_park_information({"1": ordinals("2022-06-23"), "2": []}),
+        )
+
+    def testGetOrCompute_EvictsLeastRecentlyUsed(self):
+        memo = AvailabilityMemo(max_entries=2)
+        compute = mock.Mock(side_effect=lambda: object())
+        parks = [{"1": ordinals(day)} for day in ("2022-06-22", "2022-06-23", "2022-06-24")]
+
+        first = memo.get_or_compute(parks[0], (), compute)
+        memo.get_or_compute(parks[1], (), compute)
+        self.assertIs(first, memo.get_or_compute(parks[0], (), compute))
+        memo.get_or_compute(parks[2], (), compute)
+        memo.get_or_compute(parks[1], (), compute)
+
+        self.assertEqual(4, compute.call_count)
+        self.assertEqual(2, len(memo))
+        self.assertEqual(
+            {"hits": 1, "misses": 4, "expired": 0, "evictions": 2},
+            memo.stats.as_dict(),
+        )
+
+    def testParkAvailability_UnchangedAvailabilityIsNotRecomputed(self):
+        start_date = datetime(2022, 6, 22)
+        end_date = datetime(2022, 6, 24)
+        engine = mock.Mock(wraps=camping.AVAILABILITY_ENGINES["bitset"])
+
+        def check(park_information, nights=1):
+            return camping.park_availability(
+                park_information, "SOME PARK", start_date, end_date, nights, False, "bitset", False,
+            )
+
+        camping.configure_memo(8)
+        try:
+            with mock.patch.dict(camping.AVAILABILITY_ENGINES, bitset=engine):
+                first = check({"1": ordinals("2022-06-22", "2022-06-23")})
+                again = check({"1": ordinals("2022-06-22", "2022-06-23")})
+                check({"1": ordinals("2022-06-22", "2022-06-23")}, nights=2)
+                changed = check({"1": ordinals("2022-06-22")})
+        finally:
+            camping.configure_memo(0)
+
+        self.assertEqual(first, again)
+        self.assertEqual(3, engine.call_count)
+        self.assertEqual(1, changed.current)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,10 @@
+import io
+import json
+import time
 import unittest
+from contextlib import redirect_stdout
+from datetime import date, datetime
+from unittest import mock
 
 import camping
 from enums.date_format import DateFormat
@@ -6,22 +12,22 @@ from enums.emoji import Emoji
 from utils.camping_argparser import CampingArgumentParser
 
 
+def ordinals(*days):
+    return [date.fromisoformat(day).toordinal() for day in days]
+
+
 class TestCamping(unittest.TestCase):
     def testGetNumAvailableSites_AggregatesDataForMultipleCampsites(self):
         park_info = {
             "1": [],
-            "2": [
-                "2022-06-22T00:00:00Z",
-                "2022-06-23T00:00:00Z",
-                "2022-06-26T00:00:00Z",
-            ],
-            "3": [
-                "2022-06-22T00:00:00Z",
-                "2022-06-23T00:00:00Z",
-                "2022-06-26T00:00:00Z",
-                "2022-06-27T00:00:00Z",
-                "2022-06-29T00:00:00Z",
-            ],
+            "2": ordinals("2022-06-22", "2022-06-23", "2022-06-26"),
+            "3": ordinals(
+                "2022-06-22",
+                "2022-06-23",
+                "2022-06-26",
+                "2022-06-27",
+                "2022-06-29",
+            ),
         }
 
         _, _, available_dates_by_campsite_id = camping.get_num_available_sites(
@@ -34,6 +40,372 @@ class TestCamping(unittest.TestCase):
         self.assertTrue(2 in available_dates_by_campsite_id)
         self.assertTrue(3 in available_dates_by_campsite_id)
 
+    def testGetParkInformation_ConcurrentFetchMatchesSerialFetch(self):
+        def fake_availability(park_id, month_date):
+            # Make earlier months finish last.
+            time.sleep((12 - month_date.month) * 0.01)
+            day = month_date.strftime("%Y-%m-01T00:00:00Z")
+            return {
+                "campsites": {
+                    "1": {
+                        "availabilities": {day: "Available"},
+                        "campsite_type": "STANDARD NONELECTRIC",
+                        "campsite_id": "1",
+                    }
+                }
+            }
+
+        start_date = datetime(2022, 6, 1)
+        end_date = datetime(2022, 10, 1)
+        with mock.patch.object(
+            camping.RecreationClient,
+            "get_availability",
+            side_effect=fake_availability,
+        ):
+            serial = camping.get_park_information(1, start_date, end_date)
+            concurrent = camping.get_park_information(
+                1, start_date, end_date, max_concurrency=4
+            )
+
+        self.assertEqual(serial, concurrent)
+        self.assertEqual(
+            ordinals(
+                "2022-06-01",
+                "2022-07-01",
+                "2022-08-01",
+                "2022-09-01",
+                "2022-10-01",
+            ),
+            list(concurrent["1"]),
+        )
+
+    def testGetParkInformation_KeepsSitesWithoutAvailabilityCheaply(self):
+        months = iter(
+            [
+                {
+                    "campsites": {
+                        site: {
+                            "availabilities": {
+                                "2022-06-22T00:00:00Z": value,
+                                "2022-06-23T00:00:00Z": "Reserved",
+                            },
+                            "campsite_type": "STANDARD NONELECTRIC",
+                            "campsite_id": site,
+                        }
+                        for site, value in (("1", "Available"), ("2", "Reserved"))
+                    }
+                }
+            ]
+        )
+        with mock.patch.object(
+            camping.RecreationClient,
+            "get_availability",
+            side_effect=lambda park_id, month_date: next(months),
+        ):
+            park_information = camping.get_park_information(
+                1, datetime(2022, 6, 22), datetime(2022, 6, 24)
+            )
+
+        self.assertEqual(ordinals("2022-06-22"), list(park_information["1"]))
+        self.assertIs(camping.NO_AVAILABILITY, park_information["2"])
+        self.assertEqual(
+            (1, 2),
+            camping.get_num_available_sites(
+                park_information, datetime(2022, 6, 22), datetime(2022, 6, 24), nights=1
+            )[:2],
+        )
+
+    def testCheckParks_ParallelYieldsEveryParkInCompletionOrder(self):
+        def fake_check_park(park_id, start_date, end_date, campsite_type):
+            time.sleep(park_id * 0.02)
+            return (park_id, 3, {}, "PARK {}".format(park_id))
+
+        with mock.patch.object(
+            camping, "check_park", side_effect=fake_check_park
+        ):
+            serial = list(camping.check_parks([3, 1, 2], None, None, None))
+            parallel = list(
+                camping.check_parks(
+                    [3, 1, 2], None, None, None, parallel_parks=3
+                )
+            )
+
+        self.assertEqual([3, 1, 2], [park_id for park_id, _ in serial])
+        self.assertEqual([1, 2, 3], [park_id for park_id, _ in parallel])
+        self.assertEqual(dict(serial), dict(parallel))
+
+    def testCheckParks_ClosingSkipsParksNotStartedYet(self):
+        checked = []
+
+        def fake_check_park(park_id, start_date, end_date, campsite_type):
+            checked.append(park_id)
+            time.sleep(park_id * 0.05)
+            return (park_id, 3, {}, "PARK {}".format(park_id))
+
+        with mock.patch.object(
+            camping, "check_park", side_effect=fake_check_park
+        ):
+            results = camping.check_parks(
+                [1, 2, 3, 4, 5, 6], None, None, None, parallel_parks=2
+            )
+            self.assertEqual(1, next(results)[0])
+            results.close()
+
+        self.assertEqual([1, 2, 3], sorted(checked))
+
+    def testCheckParks_PrefilterSkipsParksWithoutAvailability(self):
+        start_date = datetime(2022, 6, 1)
+        end_date = datetime(2022, 6, 3)
+        counts = {
+            "1": {"Available": 0, "Reserved": 12},
+            "2": {"Available": 1, "Reserved": 11},
+        }
+        with mock.patch.object(
+            camping.RecreationClient,
+            "get_availability_counts",
+            return_value=counts,
+        ) as get_counts, mock.patch.object(
+            camping.RecreationClient,
+            "get_park_name",
+            side_effect=lambda park_id: "PARK {}".format(park_id),
+        ), mock.patch.object(
+            camping.RecreationClient,
+            "get_availability",
+            return_value={"campsites": {}},
+        ) as get_availability:
+            info_by_park_id = dict(
+                camping.check_parks(
+                    [1, 2, 3],
+                    start_date,
+                    end_date,
+                    None,
+                    prefilter=True,
+                    availability_counts=counts,
+                )
+            )
+
+        self.assertEqual((0, 12, {}, "PARK 1"), info_by_park_id[1])
+        self.assertEqual(0, get_counts.call_count)
+        # Parks 2 and 3 still need the per-month download.
+        self.assertEqual(
+            [2, 3], [c[0][0] for c in get_availability.call_args_list]
+        )
+
+    def testCanPrefilter_OnlyWhenEveryNightIsNeeded(self):
+        start_date = datetime(2022, 6, 1)
+        end_date = datetime(2022, 6, 4)
+
+        self.assertTrue(camping.can_prefilter(start_date, end_date))
+        self.assertTrue(camping.can_prefilter(start_date, end_date, 3))
+        self.assertFalse(camping.can_prefilter(start_date, end_date, 2))
+
+    def _fake_check_park(self, park_id, start_date, end_date, *args, **kwargs):
+        if park_id == 2:
+            return camping.ParkAvailability(0, 5, {}, "EMPTY PARK")
+        return camping.ParkAvailability(
+            1,
+            5,
+            {18621: [{"start": date(2022, 6, 22), "end": date(2022, 6, 23)}]},
+            "SOME PARK",
+        )
+
+    def testSearch_ReturnsStructuredResultInParkOrder(self):
+        with mock.patch.object(
+            camping, "check_park", side_effect=self._fake_check_park
+        ), mock.patch.object(camping.RecreationClient, "warm_metadata_cache"):
+            result = camping.search(
+                [2, 1], "2022-06-22", "2022-06-23", nights=1
+            )
+
+        self.assertEqual(datetime(2022, 6, 22), result.start_date)
+        self.assertEqual([2, 1], list(result.parks))
+        self.assertEqual("SOME PARK", result.parks[1].park_name)
+        self.assertEqual(1, result.parks[1].current)
+        self.assertTrue(result.has_availabilities)
+        self.assertEqual([1], list(result.available_parks))
+
+    def testSearch_SeveralNightCountsShareOneDownload(self):
+        park_information = {"18621": ordinals("2022-06-22", "2022-06-23")}
+        with mock.patch.object(
+            camping, "get_park_information", return_value=park_information
+        ) as get_park_information, mock.patch.object(
+            camping.RecreationClient, "get_park_name", return_value="SOME PARK"
+        ), mock.patch.object(camping.RecreationClient, "warm_metadata_cache"):
+            results = camping.search(
+                [1], "2022-06-22", "2022-06-25", nights=(1, 2, 3)
+            )
+
+        get_park_information.assert_called_once()
+        self.assertEqual([1, 2, 3], list(results))
+        self.assertEqual(2, len(results[1].parks[1].available_dates_by_site_id[18621]))
+        self.assertEqual(
+            [{"start": date(2022, 6, 22), "end": date(2022, 6, 24)}],
+            results[2].parks[1].available_dates_by_site_id[18621],
+        )
+        self.assertFalse(results[3].has_availabilities)
+
+    def testPlanMonths_SkipsMonthsBetweenWindows(self):
+        windows = [
+            (datetime(2022, 6, 24), datetime(2022, 6, 26)),
+            (datetime(2022, 6, 30), datetime(2022, 7, 2)),
+            (datetime(2022, 9, 2), datetime(2022, 9, 4)),
+        ]
+
+        self.assertEqual(
+            [datetime(2022, 6, 1), datetime(2022, 7, 1), datetime(2022, 9, 1)],
+            camping.plan_months(windows),
+        )
+
+    def testSearch_WindowsShareOneDownload(self):
+        park_information = {
+            "18621": ordinals("2022-06-24", "2022-06-25", "2022-09-02")
+        }
+        windows = [("2022-06-24", "2022-06-26"), ("2022-09-02", "2022-09-04")]
+        with mock.patch.object(
+            camping, "get_park_information", return_value=park_information
+        ) as get_park_information, mock.patch.object(
+            camping.RecreationClient, "get_park_name", return_value="SOME PARK"
+        ), mock.patch.object(camping.RecreationClient, "warm_metadata_cache"):
+            results = camping.search([1], None, None, nights=2, windows=windows)
+
+        get_park_information.assert_called_once()
+        self.assertEqual(
+            [datetime(2022, 6, 1), datetime(2022, 9, 1)],
+            get_park_information.call_args.kwargs["months"],
+        )
+        june, september = results.values()
+        self.assertEqual(datetime(2022, 6, 24), june.start_date)
+        self.assertEqual(
+            [{"start": date(2022, 6, 24), "end": date(2022, 6, 26)}],
+            june.parks[1].available_dates_by_site_id[18621],
+        )
+        self.assertFalse(september.has_availabilities)
+
+    def testSearch_WidensDatesToCoverEveryWindow(self):
+        month_data = {
+            "campsites": {
+                "1": {
+                    "availabilities": {
+                        "2025-08-01T00:00:00Z": "Available",
+                        "2025-08-02T00:00:00Z": "Available",
+                    },
+                    "campsite_type": "STANDARD NONELECTRIC",
+                    "campsite_id": "1",
+                }
+            }
+        }
+        with mock.patch.object(
+            camping.RecreationClient, "get_availability", return_value=month_data
+        ), mock.patch.object(
+            camping.RecreationClient, "get_park_name", return_value="SOME PARK"
+        ), mock.patch.object(camping.RecreationClient, "warm_metadata_cache"):
+            results = camping.search(
+                [1], "2025-06-01", "2025-06-10", nights=2,
+                windows=[("2025-08-01", "2025-08-03")],
+            )
+
+        (august,) = results.values()
+        self.assertEqual(1, august.parks[1].current)
+
+    def testConfigureRateLimits_NoEndpointLimitsEveryEndpoint(self):
+        with mock.patch.object(
+            camping.RecreationClient, "configure_rate_limit"
+        ) as configure_rate_limit:
+            camping.configure_rate_limits([("campground", 0.5), (None, 2.0)])
+
+        self.assertEqual(
+            [mock.call("campground", 0.5)]
+            + [mock.call(name, 2.0) for name in camping.RecreationClient.ENDPOINTS],
+            configure_rate_limit.call_args_list,
+        )
+
+    def testRunQueries_FetchesEveryParkMonthOnce(self):
+        def fake_availability(park_id, month_date):
+            return {
+                "campsites": {
+                    "1": {
+                        "availabilities": {
+                            "2022-06-30T00:00:00Z": "Available",
+                            "2022-07-01T00:00:00Z": "Available",
+                        },
+                        "campsite_type": "STANDARD NONELECTRIC",
+                        "campsite_id": "1",
+                    }
+                }
+            }
+
+        queries = [
+            camping.Query(1, "2022-06-29", "2022-07-01", nights=1),
+            camping.Query(1, "2022-06-30", "2022-07-02", nights=2),
+            camping.Query("2", "2022-06-01", "2022-06-30"),
+        ]
+        with mock.patch.object(
+            camping.RecreationClient,
+            "get_availability",
+            side_effect=fake_availability,
+        ) as get_availability, mock.patch.object(
+            camping.RecreationClient, "get_park_name", return_value="SOME PARK"
+        ), mock.patch.object(camping.RecreationClient, "warm_metadata_cache"):
+            batch = camping.run_queries(queries, max_concurrency=2)
+
+        self.assertEqual(3, get_availability.call_count)
+        self.assertEqual((5, 3, 2), (
+            batch.requested_months, batch.fetched_months, batch.saved_requests
+        ))
+        first, second, third = batch.results
+        self.assertEqual(
+            [{"start": date(2022, 6, 30), "end": date(2022, 7, 1)}],
+            first.available_dates_by_site_id[1],
+        )
+        self.assertEqual(1, second.current)
+        self.assertEqual(0, third.current)
+
+    def testCountSitesByStartDate_CountsEveryStartOfEveryRun(self):
+        runs_by_site_id = {
+            1: [
+                {"start": date(2022, 6, 22), "end": date(2022, 6, 25)},
+                {"start": date(2022, 6, 26), "end": date(2022, 6, 28)},
+            ],
+            2: [{"start": date(2022, 6, 23), "end": date(2022, 6, 26)}],
+        }
+
+        self.assertEqual(
+            {
+                date(2022, 6, 22): 1,
+                date(2022, 6, 23): 2,
+                date(2022, 6, 24): 1,
+                date(2022, 6, 26): 1,
+            },
+            camping.count_sites_by_start_date(runs_by_site_id, 2),
+        )
+
+    def testMain_PrintsJsonOutputOfSearch(self):
+        args = CampingArgumentParser().parse_args(
+            [
+                "--start-date",
+                "2022-06-22",
+                "--end-date",
+                "2022-06-23",
+                "--parks",
+                "1",
+                "2",
+                "--json-output",
+            ]
+        )
+        stdout = io.StringIO()
+        with mock.patch.object(
+            camping, "check_park", side_effect=self._fake_check_park
+        ), mock.patch.object(
+            camping.RecreationClient, "warm_metadata_cache"
+        ), redirect_stdout(stdout):
+            has_availabilities = camping.main(args)
+
+        self.assertTrue(has_availabilities)
+        self.assertEqual(
+            {"1": {"18621": [{"start": "2022-06-22", "end": "2022-06-23"}]}},
+            json.loads(stdout.getvalue()),
+        )
+
     def testGenerateOutputToHuman_DefaultOutputWithAvailabilities(self):
         start_date = CampingArgumentParser.TypeConverter.date("2022-06-01")
         end_date = CampingArgumentParser.TypeConverter.date("2022-07-01")
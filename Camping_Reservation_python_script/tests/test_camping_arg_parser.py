@@ -1,4 +1,7 @@
+import io
 import unittest
+from contextlib import redirect_stderr
+from datetime import datetime
 
 from utils.camping_argparser import CampingArgumentParser
 
@@ -31,6 +34,82 @@ class TestCampingArgParser(unittest.TestCase):
         args.extend(self.end_date)
         CampingArgumentParser().parse_args(args)
 
+    def testNightsAcceptsACountARangeOrAList(self):
+        parser = CampingArgumentParser()
+
+        def nights(value):
+            return parser.parse_args(self.default_args + ["--nights", value]).nights
+
+        self.assertEqual(3, nights("3"))
+        self.assertEqual((2, 3, 4), nights("2-4"))
+        self.assertEqual((2, 3, 5), nights("5,2,3"))
+
+    def testNightsRejectsNonPositiveCounts(self):
+        for value in ("0", "0-2", "2,x"):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                CampingArgumentParser().parse_args(
+                    self.default_args + ["--nights", value]
+                )
+
+    def testRateLimitRejectsUnknownEndpoints(self):
+        args = CampingArgumentParser().parse_args(
+            self.default_args + ["--rate-limit", "2", "--rate-limit", "search=0.5"]
+        )
+        self.assertEqual([(None, 2.0), ("search", 0.5)], args.rate_limit)
+        for value in ("foo=2", "availability=0", "x"):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                CampingArgumentParser().parse_args(
+                    self.default_args + ["--rate-limit", value]
+                )
+
+
+    def testWindowsReplaceStartAndEndDates(self):
+        args = CampingArgumentParser().parse_args(
+            self.parks
+            + ["--window", "2022-09-02:2022-09-04"]
+            + ["--window", "2022-06-24:2022-06-26"]
+        )
+
+        self.assertEqual(
+            [
+                (datetime(2022, 6, 24), datetime(2022, 6, 26)),
+                (datetime(2022, 9, 2), datetime(2022, 9, 4)),
+            ],
+            args.windows,
+        )
+        self.assertEqual(datetime(2022, 6, 24), args.start_date)
+        self.assertEqual(datetime(2022, 9, 4), args.end_date)
+
+    def testDatesAreWidenedToCoverEveryWindow(self):
+        args = CampingArgumentParser().parse_args(
+            self.parks
+            + ["--start-date", "2025-06-01", "--end-date", "2025-06-10"]
+            + ["--window", "2025-08-01:2025-08-03"]
+        )
+
+        self.assertEqual(datetime(2025, 6, 1), args.start_date)
+        self.assertEqual(datetime(2025, 8, 3), args.end_date)
+
+    def testWindowRuleExpandsBetweenStartAndEndDates(self):
+        args = CampingArgumentParser().parse_args(
+            self.parks
+            + ["--start-date", "2022-06-01", "--end-date", "2022-06-19"]
+            + ["--window-rule", "FREQ=WEEKLY;BYDAY=FR", "--window-length", "2"]
+        )
+
+        self.assertEqual(
+            [datetime(2022, 6, 3), datetime(2022, 6, 10), datetime(2022, 6, 17)],
+            [start for start, _ in args.windows],
+        )
+        self.assertEqual(datetime(2022, 6, 19), args.windows[-1][1])
+
+    def testDatesAreRequiredWithoutWindows(self):
+        with self.assertRaises(CampingArgumentParser.ArgumentCombinationError):
+            CampingArgumentParser().parse_args(self.parks)
+        for value in ("2022-06-26:2022-06-24", "2022-06-24"):
+            with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+                CampingArgumentParser().parse_args(self.parks + ["--window", value])
+
 
 if __name__ == "__main__":
     unittest.main()
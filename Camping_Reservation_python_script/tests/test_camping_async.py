@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+import unittest
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import camping_async
+from clients.async_recreation_client import (
+    AsyncRecreationClient,
+    gather_or_cancel,
+)
+from utils.camping_argparser import CampingArgumentParser
+
+
+class _RecreationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.endswith("/month"):
+            month = parse_qs(url.query)["start_date"][0][:8]
+            body = {
+                "campsites": {
+                    "1": {
+                        "availabilities": {
+                            month + "01T00:00:00Z": "Available",
+                            month + "02T00:00:00Z": "Available",
+                            month + "03T00:00:00Z": "Reserved",
+                        },
+                        "campsite_type": "STANDARD NONELECTRIC",
+                        "campsite_id": "1",
+                    }
+                }
+            }
+        elif url.path.endswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        else:
+            body = {"campground": {"facility_name": "SOME PARK"}}
+        body = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCampingAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _RecreationHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        base_url = "http://127.0.0.1:{}".format(self.server.server_port)
+        self.client = AsyncRecreationClient()
+        self.client.AVAILABILITY_ENDPOINT = base_url + "/{park_id}/month"
+        self.client.MAIN_PAGE_ENDPOINT = base_url + "/{park_id}"
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    async def testCheckParks_CombinesEveryMonthOfEveryPark(self):
+        info_by_park_id = await camping_async.check_parks(
+            self.client,
+            [2, 1],
+            CampingArgumentParser.TypeConverter.date("2022-06-01"),
+            CampingArgumentParser.TypeConverter.date("2022-07-03"),
+            None,
+            nights=1,
+        )
+
+        self.assertEqual([2, 1], list(info_by_park_id))
+        current, maximum, dates_by_site_id, park_name = info_by_park_id[1]
+        self.assertEqual((1, 1, "SOME PARK"), (current, maximum, park_name))
+        self.assertEqual(
+            [
+                {"start": date(2022, 6, 1), "end": date(2022, 6, 2)},
+                {"start": date(2022, 6, 2), "end": date(2022, 6, 3)},
+                {"start": date(2022, 7, 1), "end": date(2022, 7, 2)},
+                {"start": date(2022, 7, 2), "end": date(2022, 7, 3)},
+            ],
+            dates_by_site_id[1],
+        )
+
+    async def testSendRequest_RaisesOnNonOkStatus(self):
+        with self.assertRaises(RuntimeError):
+            await self.client.get_park_name("missing")
+
+    async def testGatherOrCancel_CancelsSiblingsOnFailure(self):
+        sibling_cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                sibling_cancelled.set()
+                raise
+
+        async def failing():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            await gather_or_cancel(slow(), failing())
+        self.assertTrue(sibling_cancelled.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import argparse
+import io
+import unittest
+from contextlib import redirect_stdout
+from datetime import date
+from unittest import mock
+
+import requests
+
+import camping_notification
+from models.classification import Classification, DateRange
+
+
+class TestCampingNotification(unittest.TestCase):
+    def setUp(self):
+        self.weekend = DateRange(date(2025, 6, 6), date(2025, 6, 8))
+        self.weekday = DateRange(date(2025, 6, 9), date(2025, 6, 11))
+
+    def testDetectChanges_ReportsNewAndRemovedDateRanges(self):
+        changes, has_changes = camping_notification.detect_changes(
+            {self.weekend: 2}, {self.weekday: 1}
+        )
+
+        self.assertTrue(has_changes)
+        self.assertEqual(
+            changes,
+            [
+                "🔴 No longer available: 2025-06-06 (Fri) -> 2025-06-08 (Sun)",
+                "🟢 New availability: 2025-06-09 (Mon) -> 2025-06-11 (Wed) --> 1 site(s) available",
+            ],
+        )
+
+    def testChangeRecords_DescribeEachChange(self):
+        records = list(
+            camping_notification.change_records({}, {self.weekend: 3})
+        )
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["type"], "change")
+        self.assertEqual(records[0]["change"], "new")
+        self.assertEqual(records[0]["start"], "2025-06-06")
+        self.assertEqual(records[0]["end"], "2025-06-08")
+        self.assertEqual(records[0]["site_count"], 3)
+
+    def testCampingNotification_SkipsChecksThatFail(self):
+        args = argparse.Namespace(
+            format="human", frequency=1, filters=["priority", "regular", "ignored"]
+        )
+        checks = [
+            requests.ConnectionError("connection reset"),
+            Classification(2, []),
+            ValueError("unexpected response"),
+            Classification(2, []),
+        ]
+
+        def run_camping_wrapper(args):
+            check = checks.pop(0)
+            if isinstance(check, Exception):
+                raise check
+            return check
+
+        stdout = io.StringIO()
+        with mock.patch.object(
+            camping_notification, "run_camping_wrapper", side_effect=run_camping_wrapper
+        ), mock.patch.object(
+            camping_notification.time, "sleep", side_effect=[None, None, None, KeyboardInterrupt]
+        ), redirect_stdout(stdout):
+            camping_notification.camping_notification(args)
+
+        self.assertEqual([], checks)
+        self.assertIn("Error: connection reset", stdout.getvalue())
+        self.assertIn("Error: unexpected response", stdout.getvalue())
+        self.assertIn("Goodbye", stdout.getvalue())
+
+    def testRunCampingWrapper_ResetsRetryBudgetEveryCheck(self):
+        args = argparse.Namespace(
+            format="human", tier_rules=None, start_date="2025-06-06", end_date="2025-06-08", parks=["1"], nights=2
+        )
+        with mock.patch.object(
+            camping_notification.camping_wrapper, "search_and_filter"
+        ), mock.patch.object(
+            camping_notification.RecreationClient, "reset_retry_budget"
+        ) as reset_retry_budget:
+            camping_notification.run_camping_wrapper(args)
+            camping_notification.run_camping_wrapper(args)
+
+        self.assertEqual(2, reset_retry_budget.call_count)
+
+    def testRunCampingWrapper_LogsIncrementalStatsEveryCheck(self):
+        args = argparse.Namespace(
+            format="human", tier_rules=None, start_date="2025-06-06", end_date="2025-06-08", parks=["1"], nights=2
+        )
+        camping_notification.camping.configure_incremental(True)
+        self.addCleanup(camping_notification.camping.configure_incremental, False)
+        with mock.patch.object(
+            camping_notification.camping_wrapper, "search_and_filter"
+        ), self.assertLogs(camping_notification.camping.LOG, "DEBUG") as logs:
+            camping_notification.run_camping_wrapper(args)
+
+        self.assertEqual(1, len(logs.output))
+        self.assertIn("Incremental stats: {", logs.output[0])
@@ -0,0 +1,134 @@
+import io
+import json
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import camping_wrapper
+from models.availability import ParkAvailability, SearchResult
+from models.classification import DateRange
+
+
+def stay(start, end):
+    return {"start": date.fromisoformat(start), "end": date.fromisoformat(end)}
+
+
+class TestCampingWrapper(unittest.TestCase):
+    def setUp(self):
+        # 2025-06-06 is a Friday.
+        self.parks = {
+            232448: ParkAvailability(
+                2,
+                10,
+                {
+                    1: [
+                        stay("2025-06-06", "2025-06-08"),
+                        stay("2025-06-09", "2025-06-11"),
+                    ],
+                    2: [
+                        stay("2025-06-06", "2025-06-08"),
+                        stay("2025-06-07", "2025-06-09"),
+                    ],
+                },
+                "PINNACLES CAMPGROUND",
+            ),
+        }
+
+    def testFilterByDays_CountsSitesPerDateRangeAndTier(self):
+        classification = camping_wrapper.filter_by_days(self.parks, 2)
+
+        (park,) = classification.parks
+        self.assertEqual(park.park_id, 232448)
+        self.assertEqual(park.park_name, "PINNACLES CAMPGROUND")
+        weekend = DateRange(date(2025, 6, 6), date(2025, 6, 8))
+        self.assertEqual(park.priority, {weekend: 2})
+        self.assertEqual(
+            park.regular, {DateRange(date(2025, 6, 7), date(2025, 6, 9)): 1}
+        )
+        self.assertEqual(
+            park.ignored, {DateRange(date(2025, 6, 9), date(2025, 6, 11)): 1}
+        )
+        self.assertEqual(weekend.nights, 2)
+
+    def testFilterByDays_SkipsStaysShorterThanMinNights(self):
+        classification = camping_wrapper.filter_by_days(self.parks, 3)
+
+        self.assertEqual(classification.by_tier(), {})
+
+    def testByTier_MergesTheRequestedTiers(self):
+        classification = camping_wrapper.filter_by_days(self.parks, 2)
+
+        merged = classification.by_tier(["priority", "ignored"])
+
+        self.assertEqual(
+            {str(date_range): count for date_range, count in merged.items()},
+            {
+                "2025-06-06 (Fri) -> 2025-06-08 (Sun)": 2,
+                "2025-06-09 (Mon) -> 2025-06-11 (Wed)": 1,
+            },
+        )
+
+    def testFormatResults_RendersEveryTierPerPark(self):
+        classification = camping_wrapper.filter_by_days(self.parks, 2)
+
+        output = camping_wrapper.format_results(classification)
+
+        self.assertEqual(
+            output.splitlines(),
+            [
+                "🏕 PINNACLES CAMPGROUND",
+                "  **Priority Results:**",
+                "  \033[1m2025-06-06 (Fri) -> 2025-06-08 (Sun) --> 2 site(s) available\033[0m",
+                "🏕 PINNACLES CAMPGROUND",
+                "  **Regular Results:**",
+                "  2025-06-07 (Sat) -> 2025-06-09 (Mon) --> 1 site(s) available",
+                "🏕 PINNACLES CAMPGROUND",
+                "  **Ignored Results:**",
+                "  2025-06-09 (Mon) -> 2025-06-11 (Wed) --> 1 site(s) available",
+            ],
+        )
+
+    def testWriteNdjson_OneFlushedRecordPerTierAndDateRange(self):
+        classification = camping_wrapper.filter_by_days(self.parks, 2)
+        stream = mock.Mock(wraps=io.StringIO())
+
+        camping_wrapper.write_ndjson(
+            camping_wrapper.ndjson_records(classification.parks[0]), stream
+        )
+
+        stream.flush.assert_called_once_with()
+        records = [
+            json.loads(line)
+            for line in stream.getvalue().splitlines()
+        ]
+        self.assertEqual(
+            [(r["tier"], r["start"], r["site_count"]) for r in records],
+            [
+                ("priority", "2025-06-06", 2),
+                ("regular", "2025-06-07", 1),
+                ("ignored", "2025-06-09", 1),
+            ],
+        )
+        self.assertEqual(records[0]["park_name"], "PINNACLES CAMPGROUND")
+        self.assertEqual(records[0]["nights"], 2)
+
+    def testSearchAndFilter_ReportsEachParkAsItFinishes(self):
+        empty = ParkAvailability(0, 5, {}, "EMPTY CAMPGROUND")
+        parks = dict(self.parks, **{"1": empty})
+        reported = []
+
+        def fake_search(park_ids, start_date, end_date, nights, on_result):
+            for park_id in park_ids:
+                on_result(park_id, parks[park_id])
+                # Parks reported so far must not wait for the rest.
+                self.assertEqual(len(reported), 1)
+            return SearchResult(datetime(2025, 6, 1), datetime(2025, 6, 30), parks)
+
+        with mock.patch("camping.search", side_effect=fake_search):
+            classification = camping_wrapper.search_and_filter(
+                "2025-06-01", "2025-06-30", [232448, "1"], 2,
+                on_park=reported.append,
+            )
+
+        self.assertEqual([park.park_id for park in reported], [232448])
+        self.assertEqual(classification.parks, reported)
@@ -0,0 +1,86 @@
+import random
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import camping
+
+
+def month_response(month_date, availability_by_site):
+    return {
+        "campsites": {
+            site: {
+                "availabilities": {
+                    "{:%Y-%m}-{:02d}T00:00:00Z".format(month_date, day): value
+                    for day, value in days.items()
+                },
+                "campsite_type": "STANDARD NONELECTRIC",
+                "campsite_id": site,
+            }
+            for site, days in availability_by_site.items()
+        }
+    }
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(4)
+        self.months = camping.get_months(datetime(2022, 6, 1), datetime(2022, 8, 31))
+        self.availability = {
+            month_date: {
+                str(site): {
+                    day: rng.choice(["Available", "Reserved"])
+                    for day in range(1, 31)
+                }
+                for site in range(20)
+            }
+            for month_date in self.months
+        }
+        # A run crossing from June into July at site 0.
+        for day in (28, 29, 30):
+            self.availability[self.months[0]]["0"][day] = "Available"
+        for day in (1, 2):
+            self.availability[self.months[1]]["0"][day] = "Available"
+
+        camping.configure_incremental(True)
+        self.addCleanup(camping.configure_incremental, False)
+
+    def flip(self, month_date, site, day):
+        days = self.availability[month_date][site]
+        days[day] = "Reserved" if days[day] == "Available" else "Available"
+
+    def check(self, nights):
+        with mock.patch.object(
+            camping.RecreationClient,
+            "get_availability",
+            side_effect=lambda park_id, month_date: month_response(
+                month_date, self.availability[month_date]
+            ),
+        ), mock.patch.object(
+            camping.RecreationClient, "get_park_name", return_value="SOME PARK"
+        ):
+            return camping.check_park(
+                1, datetime(2022, 6, 1), datetime(2022, 8, 31), None, nights=nights
+            )
+
+    def testCheckPark_OnlyChangedSitesAreRecomputed(self):
+        for nights in (3, (1, 4)):
+            self.check(nights)
+            before = camping.get_incremental_stats()
+
+            # Book (then free again) the first night of July at site 0, which
+            # splits the run crossing the month boundary, and flip a night
+            # of site 5.
+            self.flip(self.months[1], "0", 1)
+            self.flip(self.months[2], "5", 10)
+            incremental = self.check(nights)
+            after = camping.get_incremental_stats()
+
+            with mock.patch.object(camping, "incremental_parks", None):
+                self.assertEqual(self.check(nights), incremental)
+            self.assertEqual(2, after["sites_recomputed"] - before["sites_recomputed"])
+            self.assertEqual(1, after["months_reused"] - before["months_reused"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from utils.rate_limiter import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "rate_limit.sqlite3")
+        self.now = 1000.0
+        patcher = mock.patch(
+            "utils.rate_limiter.time.time", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _sleep(self, seconds):
+        self.now += seconds
+
+    def testAcquire_AllowsBurstThenWaitsForRefill(self):
+        bucket = TokenBucket("availability", rate=2, capacity=2, path=self.path)
+        with mock.patch(
+            "utils.rate_limiter.time.sleep", side_effect=self._sleep
+        ) as sleep:
+            bucket.acquire()
+            bucket.acquire()
+            self.assertEqual(0, sleep.call_count)
+            bucket.acquire()
+
+        sleep.assert_called_once_with(0.5)
+        self.assertEqual(1, bucket.stats.waited)
+        self.assertEqual(3, bucket.stats.acquired)
+
+    def testAcquire_SharesTokensBetweenInstancesUsingTheSameFile(self):
+        first = TokenBucket("availability", rate=1, path=self.path)
+        second = TokenBucket("availability", rate=1, path=self.path)
+        other_endpoint = TokenBucket("campground", rate=1, path=self.path)
+        with mock.patch(
+            "utils.rate_limiter.time.sleep", side_effect=self._sleep
+        ) as sleep:
+            first.acquire()
+            other_endpoint.acquire()
+            self.assertEqual(0, sleep.call_count)
+            second.acquire()
+
+        sleep.assert_called_once_with(1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,250 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from clients.connection_pool import ConnectionStats, build_session
+from clients.recreation_client import RecreationClient
+from clients.retry import RetryPolicy
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"campground": {"facility_name": "SOME PARK"}})
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRecreationClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _JsonHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = "http://127.0.0.1:{}/".format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        RecreationClient.close_session()
+        RecreationClient.configure_retries()
+
+    def testBuildSession_ReusesConnectionWithKeepAlive(self):
+        stats = ConnectionStats()
+        session = build_session(stats=stats)
+        for _ in range(3):
+            session.get(self.url).json()
+
+        self.assertEqual(
+            {"opened": 1, "reused": 2, "requests": 3}, stats.as_dict()
+        )
+
+    def testBuildSession_OpensConnectionPerRequestWithoutKeepAlive(self):
+        stats = ConnectionStats()
+        session = build_session(stats=stats, keep_alive=False)
+        for _ in range(3):
+            session.get(self.url).json()
+
+        self.assertEqual(3, stats.as_dict()["opened"])
+        self.assertEqual(0, stats.as_dict()["reused"])
+
+    def testGetParkName_SharesSessionAcrossCalls(self):
+        RecreationClient.connection_stats.reset()
+        endpoint = RecreationClient.MAIN_PAGE_ENDPOINT
+        RecreationClient.MAIN_PAGE_ENDPOINT = self.url + "{park_id}"
+        try:
+            names = [RecreationClient.get_park_name(i) for i in range(3)]
+        finally:
+            RecreationClient.MAIN_PAGE_ENDPOINT = endpoint
+
+        self.assertEqual(["SOME PARK"] * 3, names)
+        self.assertEqual(1, RecreationClient.get_connection_stats()["opened"])
+        self.assertEqual(2, RecreationClient.get_connection_stats()["reused"])
+
+    def testGetAvailability_ServesRepeatedMonthsFromCache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            RecreationClient.configure_cache(
+                60, path=os.path.join(directory, "cache.sqlite3")
+            )
+            try:
+                with mock.patch.object(
+                    RecreationClient,
+                    "_send_request",
+                    return_value={"campsites": {}},
+                ) as send_request:
+                    for park_id in (1, 1, 2, 1):
+                        RecreationClient.get_availability(
+                            park_id, datetime(2022, 6, 1)
+                        )
+                stats = RecreationClient.get_cache_stats()["availability"]
+            finally:
+                RecreationClient.configure_cache(0)
+
+        self.assertEqual(2, send_request.call_count)
+        self.assertEqual(2, stats["hits"])
+        self.assertEqual(2, stats["misses"])
+
+    def testGetParkName_MakesNoRequestsAfterWarmUp(self):
+        with tempfile.TemporaryDirectory() as directory:
+            RecreationClient.configure_metadata_cache(
+                3600, path=os.path.join(directory, "cache.sqlite3")
+            )
+            try:
+                with mock.patch.object(
+                    RecreationClient,
+                    "_send_request",
+                    side_effect=lambda url, params, endpoint: {
+                        "campground": {"facility_name": url}
+                    },
+                ) as send_request:
+                    fetched = RecreationClient.warm_metadata_cache([1, 2, 1])
+                    self.assertEqual(2, send_request.call_count)
+
+                    names = [RecreationClient.get_park_name(i) for i in (1, 2)]
+                    refetched = RecreationClient.warm_metadata_cache([1, 2])
+            finally:
+                RecreationClient.configure_metadata_cache(0)
+
+        self.assertEqual(2, fetched)
+        self.assertEqual(0, refetched)
+        self.assertEqual(2, send_request.call_count)
+        self.assertEqual(
+            [
+                RecreationClient.MAIN_PAGE_ENDPOINT.format(park_id=1),
+                RecreationClient.MAIN_PAGE_ENDPOINT.format(park_id=2),
+            ],
+            names,
+        )
+
+    def _fake_response(self, status_code, headers=None):
+        resp = mock.Mock(status_code=status_code, headers=headers or {})
+        resp.json.return_value = {"status": status_code}
+        return resp
+
+    def testSendRequest_RetriesThrottledRequestsAfterRetryAfter(self):
+        RecreationClient.configure_retries(max_retries=3, budget=10)
+        session = mock.Mock()
+        session.get.side_effect = [
+            self._fake_response(429, {"Retry-After": "7"}),
+            self._fake_response(503),
+            self._fake_response(200),
+        ]
+        with mock.patch.object(
+            RecreationClient, "get_session", return_value=session
+        ), mock.patch("clients.recreation_client.time.sleep") as sleep:
+            resp = RecreationClient._send_request(self.url, {})
+
+        self.assertEqual({"status": 200}, resp)
+        self.assertEqual(2, sleep.call_count)
+        self.assertGreaterEqual(sleep.call_args_list[0][0][0], 7)
+        self.assertEqual(2, RecreationClient.get_retry_stats()["retries"])
+
+    def testSendRequest_CapsRetryAfterAtBackoffMax(self):
+        RecreationClient.configure_retries(max_retries=3, backoff_max=30, budget=10)
+        session = mock.Mock()
+        session.get.side_effect = [
+            self._fake_response(429, {"Retry-After": "86400"}),
+            self._fake_response(200),
+        ]
+        with mock.patch.object(
+            RecreationClient, "get_session", return_value=session
+        ), mock.patch("clients.recreation_client.time.sleep") as sleep:
+            resp = RecreationClient._send_request(self.url, {})
+
+        self.assertEqual({"status": 200}, resp)
+        sleep.assert_called_once_with(30)
+
+    def testSendRequest_StopsRetryingWhenBudgetIsSpent(self):
+        RecreationClient.configure_retries(max_retries=3, budget=1)
+        session = mock.Mock()
+        session.get.side_effect = lambda *args, **kwargs: self._fake_response(
+            500
+        )
+        with mock.patch.object(
+            RecreationClient, "get_session", return_value=session
+        ), mock.patch("clients.recreation_client.time.sleep"):
+            with self.assertRaises(RuntimeError):
+                RecreationClient._send_request(self.url, {})
+            with self.assertRaises(RuntimeError):
+                RecreationClient._send_request(self.url, {})
+
+        self.assertEqual(3, session.get.call_count)
+        self.assertEqual(
+            {"retries": 1, "budget": 1, "budget_exhausted": 2},
+            RecreationClient.get_retry_stats(),
+        )
+
+    def testResetRetryBudget_AllowsRetriesAgain(self):
+        RecreationClient.configure_retries(max_retries=3, budget=1)
+        policy = RecreationClient.retry_policy
+
+        self.assertTrue(policy.should_retry(0))
+        self.assertFalse(policy.should_retry(0))
+        RecreationClient.reset_retry_budget()
+
+        self.assertIs(policy, RecreationClient.retry_policy)
+        self.assertTrue(policy.should_retry(0))
+
+    def testSendRequest_DoesNotRetryClientErrors(self):
+        session = mock.Mock()
+        session.get.return_value = self._fake_response(404)
+        with mock.patch.object(
+            RecreationClient, "get_session", return_value=session
+        ):
+            with self.assertRaises(RuntimeError):
+                RecreationClient._send_request(self.url, {})
+
+        self.assertEqual(1, session.get.call_count)
+
+    def testRetryPolicy_DelayGrowsExponentiallyUpToMaximum(self):
+        policy = RetryPolicy(backoff_base=1, backoff_max=5)
+        with mock.patch(
+            "clients.retry.random.uniform", side_effect=lambda a, b: b
+        ):
+            delays = [policy.get_delay(attempt) for attempt in range(5)]
+
+        self.assertEqual([1, 2, 4, 5, 5], delays)
+
+    def testGetAvailabilityCounts_BatchesParksIntoSearchRequests(self):
+        def search(url, params, endpoint):
+            return {
+                "results": [
+                    {
+                        "entity_id": park_id,
+                        "availability_counts": {"Available": 1},
+                    }
+                    for park_id in params["fq"][10:-1].split(" OR ")
+                ]
+            }
+
+        with mock.patch.object(
+            RecreationClient, "SEARCH_BATCH_SIZE", 2
+        ), mock.patch.object(
+            RecreationClient, "_send_request", side_effect=search
+        ) as send_request:
+            counts = RecreationClient.get_availability_counts(
+                [1, 2, 3, 1], datetime(2022, 6, 1), datetime(2022, 6, 3)
+            )
+
+        self.assertEqual(2, send_request.call_count)
+        self.assertEqual(
+            "asset_id:(1 OR 2)", send_request.call_args_list[0][0][1]["fq"]
+        )
+        self.assertEqual(["1", "2", "3"], sorted(counts))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from utils.single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def testDo_ConcurrentCallersShareOneExecution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch(key):
+            calls.append(key)
+            release.wait()
+            return {"key": key}
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    flight.do("1:2022-06", fetch, "1:2022-06")
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while flight.as_dict()["shared"] < 4:
+            threading.Event().wait(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(["1:2022-06"], calls)
+        self.assertEqual([{"key": "1:2022-06"}] * 5, results)
+        self.assertEqual({"executed": 1, "shared": 4}, flight.as_dict())
+
+    def testDo_RunsAgainOnceThePreviousCallFinished(self):
+        flight = SingleFlight()
+        flight.do("key", lambda: 1)
+
+        self.assertEqual(2, flight.do("key", lambda: 2))
+
+    def testDo_WaitingCallersGetTheSameException(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait()
+            raise RuntimeError("failedRequest")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("key", fail)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        while flight.as_dict()["shared"] < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(2, len(errors))
+        self.assertIs(errors[0], errors[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
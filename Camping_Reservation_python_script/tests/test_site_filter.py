@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import camping
+from utils import day_calendar
+from utils.site_filter import SiteExclusions, SiteIdSet, excluded_for_park
+
+
+class TestSiteFilter(unittest.TestCase):
+    def testSiteIdSet_LooksUpIdsAndMergedRanges(self):
+        site_ids = SiteIdSet(
+            range(0, 40000, 2), [(100010, 100020), (100015, 100030), (5, 5)]
+        )
+
+        self.assertEqual((5, 100010), site_ids.starts)
+        self.assertEqual((5, 100030), site_ids.ends)
+        self.assertIn("39998", site_ids)
+        self.assertIn(100030, site_ids)
+        self.assertIn("5", site_ids)
+        self.assertNotIn("39999", site_ids)
+        self.assertNotIn("100031", site_ids)
+        self.assertNotIn("not-a-number", site_ids)
+
+    def testLoadExclusionFile_ReadsRangesAndParkScopedSites(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "excluded.txt")
+            with open(path, "w") as f:
+                f.write(
+                    "# Group sites\n"
+                    "1001\n"
+                    "2000-2099 # loop B\n"
+                    "232447:3001\n"
+                    "232447:4000-4010\n"
+                )
+            exclusions = camping.load_exclusion_file(path)
+
+        everywhere = exclusions.for_park(232448)
+        self.assertIn("1001", everywhere)
+        self.assertIn("2050", everywhere)
+        self.assertNotIn("3001", everywhere)
+        scoped = excluded_for_park(exclusions, "232447")
+        self.assertIn("1001", scoped)
+        self.assertIn("3001", scoped)
+        self.assertIn("4010", scoped)
+        self.assertNotIn("4011", scoped)
+
+    def testParse_KeepsOtherLinesAsLiteralIds(self):
+        exclusions = SiteExclusions.parse(["abc", "1-x", "232447:", "5"])
+
+        everywhere = exclusions.for_park(232447)
+        for site_id in ("abc", "1-x", "232447:", "5"):
+            self.assertIn(site_id, everywhere)
+        self.assertNotIn("1", everywhere)
+        self.assertEqual({}, exclusions.by_park)
+
+    def testCollapseParkInformation_FiltersEachSiteOnce(self):
+        def site(campsite_id, campsite_type):
+            return {
+                "availabilities": {"2022-06-22T00:00:00Z": "Available"},
+                "campsite_type": campsite_type,
+                "campsite_id": campsite_id,
+            }
+
+        month_data = {
+            "campsites": {
+                "1": site("1", "STANDARD NONELECTRIC"),
+                "2": site("2", "GROUP STANDARD NONELECTRIC"),
+                "3": site("3", "STANDARD NONELECTRIC"),
+            }
+        }
+        park_information = camping.collapse_park_information(
+            [month_data],
+            day_calendar.get_calendar(datetime(2022, 6, 22), datetime(2022, 6, 23)),
+            "STANDARD NONELECTRIC",
+            excluded_site_ids=SiteIdSet(["3"]),
+        )
+
+        self.assertEqual(["1", "2"], list(park_information))
+        self.assertEqual(1, len(park_information["1"]))
+        self.assertIs(camping.NO_AVAILABILITY, park_information["2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
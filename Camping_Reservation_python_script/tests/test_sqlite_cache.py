@@ -0,0 +1,90 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from utils.sqlite_cache import SQLiteCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testGet_ReturnsValueStoredByAnotherInstance(self):
+        writer = SQLiteCache(self.path, namespace="availability")
+        reader = SQLiteCache(self.path, namespace="availability")
+        other_namespace = SQLiteCache(self.path, namespace="metadata")
+
+        writer.set("232448:2022-06", {"campsites": {"1": {}}})
+
+        self.assertEqual({"campsites": {"1": {}}}, reader.get("232448:2022-06"))
+        self.assertIsNone(other_namespace.get("232448:2022-06"))
+        self.assertEqual(1, reader.stats.hits)
+        self.assertEqual(1, other_namespace.stats.misses)
+
+    def testGet_ExpiresEntriesOlderThanTtl(self):
+        cache = SQLiteCache(self.path, ttl=60)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=1000):
+            cache.set("key", 1)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=1061):
+            self.assertIsNone(cache.get("key"))
+
+        self.assertEqual(
+            {"hits": 0, "misses": 1, "expired": 1, "evictions": 0},
+            cache.stats.as_dict(),
+        )
+        self.assertEqual(0, len(cache))
+
+    def testSet_EvictsLeastRecentlyUsedEntries(self):
+        cache = SQLiteCache(self.path, ttl=None, max_entries=2)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=1000):
+            cache.set("a", 1)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=1001):
+            cache.set("b", 2)
+        with mock.patch("utils.sqlite_cache.time.time", return_value=1002):
+            cache.get("a")
+        with mock.patch("utils.sqlite_cache.time.time", return_value=1003):
+            cache.set("c", 3)
+
+        self.assertEqual(1, cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(3, cache.get("c"))
+        self.assertEqual(1, cache.stats.evictions)
+
+    def testWaitFor_ReturnsValueStoredByLeaseHolder(self):
+        holder = SQLiteCache(self.path, namespace="availability")
+        waiter = SQLiteCache(self.path, namespace="availability")
+
+        token = holder.acquire_lease("key", timeout=10)
+        self.assertIsNotNone(token)
+        self.assertIsNone(waiter.acquire_lease("key", timeout=10))
+
+        def finish():
+            holder.set("key", {"campsites": {}})
+            holder.release_lease("key", token)
+
+        timer = threading.Timer(0.2, finish)
+        timer.start()
+        try:
+            value = waiter.wait_for("key", timeout=10, interval=0.01)
+        finally:
+            timer.join()
+
+        self.assertEqual({"campsites": {}}, value)
+        self.assertIsNotNone(waiter.acquire_lease("key", timeout=10))
+
+    def testWaitFor_GivesUpWhenLeaseIsReleasedWithoutValue(self):
+        holder = SQLiteCache(self.path)
+        token = holder.acquire_lease("key", timeout=10)
+        holder.release_lease("key", token)
+
+        self.assertIsNone(SQLiteCache(self.path).wait_for("key", timeout=10))
+
+
+if __name__ == "__main__":
+    unittest.main()
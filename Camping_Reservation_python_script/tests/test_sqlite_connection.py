@@ -0,0 +1,52 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from utils.sqlite_connection import LocalConnection
+
+
+class TestLocalConnection(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "nested", "db.sqlite3")
+        self.connection = LocalConnection(
+            self.path, ["CREATE TABLE IF NOT EXISTS t (x INTEGER)"]
+        )
+
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+
+    def testGet_OpensOneConnectionPerThread(self):
+        conn = self.connection.get()
+        conn.execute("INSERT INTO t VALUES (1)")
+        others = []
+
+        def other_thread():
+            other = self.connection.get()
+            others.append((other, other.execute("SELECT x FROM t").fetchall()))
+            self.connection.close()
+
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+
+        self.assertIs(conn, self.connection.get())
+        self.assertIsNot(conn, others[0][0])
+        self.assertEqual([(1,)], others[0][1])
+
+    def testGet_ReopensAfterAFork(self):
+        conn = self.connection.get()
+        with mock.patch(
+            "utils.sqlite_connection.os.getpid", return_value=os.getpid() + 1
+        ):
+            child = self.connection.get()
+
+        self.assertIsNot(conn, child)
+        child.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
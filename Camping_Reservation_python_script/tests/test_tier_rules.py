@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+from models.classification import IGNORED, PRIORITY, REGULAR, DateRange
+from utils.tier_rules import InvalidTierRules, TierRules
+
+
+def ladder(date_range, min_nights):
+    # The if/elif rules camping_wrapper.py had before the rule table.
+    if date_range.nights < min_nights:
+        return None
+    start_day = date_range.start.weekday()
+    end_day = date_range.end.weekday()
+    if min_nights == 1:
+        if start_day in (4, 5):
+            return PRIORITY
+        if start_day in (3, 6):
+            return REGULAR
+        return IGNORED
+    if min_nights == 2:
+        if start_day == 4:
+            return PRIORITY
+        if start_day in (3, 4, 5, 6) and end_day in (5, 6, 0):
+            return REGULAR
+        return IGNORED
+    if min_nights == 3:
+        return PRIORITY if start_day in (3, 4) else IGNORED
+    if min_nights == 4:
+        return PRIORITY if start_day == 3 else IGNORED
+    return PRIORITY
+
+
+class TestTierRules(unittest.TestCase):
+    def testDefaultRules_MatchTheWrapperRules(self):
+        rules = TierRules()
+        monday = date(2025, 6, 2)
+        for min_nights in range(1, 9):
+            for offset in range(7):
+                start = monday + timedelta(days=offset)
+                for nights in range(1, 10):
+                    date_range = DateRange(start, start + timedelta(days=nights))
+                    self.assertEqual(
+                        ladder(date_range, min_nights),
+                        rules.classify(date_range, min_nights),
+                        (min_nights, date_range),
+                    )
+
+    def testFromFile_FirstMatchingRuleWins(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "rules.json")
+            with open(path, "w") as f:
+                json.dump(
+                    {
+                        "rules": [
+                            {"nights": "2+", "start": ["Sat"], "tier": "priority"},
+                            {"nights": 2, "tier": "regular"},
+                        ],
+                        "default": "ignored",
+                    },
+                    f,
+                )
+            rules = TierRules.from_file(path)
+
+        saturday = date(2025, 6, 7)
+        sunday = date(2025, 6, 8)
+        self.assertEqual(
+            PRIORITY, rules.classify(DateRange(saturday, sunday + timedelta(days=1)), 2)
+        )
+        self.assertEqual(
+            REGULAR, rules.classify(DateRange(sunday, sunday + timedelta(days=2)), 2)
+        )
+        self.assertEqual(
+            IGNORED, rules.classify(DateRange(sunday, sunday + timedelta(days=3)), 3)
+        )
+        self.assertIsNone(rules.classify(DateRange(sunday, sunday + timedelta(days=1)), 2))
+
+    def testInvalidRulesAreRejected(self):
+        for rules in (
+            {"rules": [{"nights": 1, "start": ["someday"], "tier": "priority"}]},
+            {"rules": [{"nights": 1, "tier": "urgent"}]},
+            {"rules": [{"tier": "priority"}]},
+        ):
+            with self.assertRaises(InvalidTierRules):
+                TierRules(rules)
+
+
+if __name__ == "__main__":
+    unittest.main()
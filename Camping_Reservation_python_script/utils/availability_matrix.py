@@ -0,0 +1,163 @@
+import logging
+from collections import defaultdict
+
+from utils import day_calendar
+from utils.nights import is_night_counts, resolve_nights
+
+LOG = logging.getLogger(__name__)
+
+
+class AvailabilityMatrix:
+    """
+    The availability of every site of a park between `start_date` and
+    `end_date`, stored as one integer bitmask per site where bit `d` is set
+    if the site is available on the night of `start_date + d days`.
+
+    Answering "where can I stay N nights in a row" is then a handful of
+    shifts and ANDs per site instead of grouping lists of dates.
+    """
+
+    def __init__(self, park_information, start_date, end_date, weekends_only=False):
+        self.calendar = day_calendar.get_calendar(start_date, end_date)
+        self.num_days = (end_date - start_date).days
+
+        first = self.calendar.first
+        nights = range(first, first + self.num_days)
+        if weekends_only:
+            nights = [
+                ordinal for ordinal in nights
+                if self.calendar.weekday(ordinal) in (4, 5)
+            ]
+        bit_by_ordinal = {ordinal: 1 << (ordinal - first) for ordinal in nights}
+
+        self.masks = {}
+        for site, availabilities in park_information.items():
+            mask = 0
+            for ordinal in availabilities:
+                mask |= bit_by_ordinal.get(ordinal, 0)
+            if mask:
+                self.masks[site] = mask
+        self.maximum = len(park_information)
+
+    def start_days(self, site, nights):
+        """
+        Returns a bitmask of the days `site` can be checked into for `nights`
+        consecutive nights.
+        """
+        mask = self.masks.get(site, 0)
+        # After each step bit d is set if nights d .. d + span - 1 are all
+        # available; doubling the span needs O(log nights) steps.
+        span = 1
+        while span < nights and mask:
+            step = min(span, nights - span)
+            mask &= mask >> step
+            span += step
+        return mask
+
+    def start_days_by_nights(self, site, night_counts):
+        """
+        Returns `{nights: start_days(site, nights)}` for every count of
+        `night_counts`, extending the same mask one night at a time.
+        """
+        mask = self.masks.get(site, 0)
+        starts = mask
+        span = 1
+        start_days = {}
+        for nights in sorted(night_counts):
+            while span < nights and starts:
+                starts &= mask >> span
+                span += 1
+            start_days[nights] = starts
+        return start_days
+
+    def runs(self, site, nights, starts=None):
+        """
+        Returns the `(start, end)` dates of every maximal run of at least
+        `nights` free nights at `site`, in date order, where `end` is the
+        day after the last free night.
+        """
+        dates = self.calendar.dates
+        if starts is None:
+            starts = self.start_days(site, nights)
+        runs = []
+        while starts:
+            first = (starts & -starts).bit_length() - 1
+            rest = starts >> first
+            # Number of consecutive start days from `first` on.
+            length = (rest ^ (rest + 1)).bit_length() - 1
+            runs.append((dates[first], dates[first + length - 1 + nights]))
+            starts &= ~(((1 << length) - 1) << first)
+        return runs
+
+    def ranges(self, site, nights, starts=None):
+        """
+        Returns the `(start, end)` dates of every stay of `nights`
+        consecutive nights at `site`, in date order. `starts` is the
+        `start_days` mask if it is known already.
+        """
+        dates = self.calendar.dates
+        if starts is None:
+            starts = self.start_days(site, nights)
+        ranges = []
+        while starts:
+            lowest = starts & -starts
+            d = lowest.bit_length() - 1
+            ranges.append((dates[d], dates[d + nights]))
+            starts ^= lowest
+        return ranges
+
+
+def get_num_available_sites(
+    park_information, start_date, end_date, nights=None, weekends_only=False, compact=False,
+):
+    """
+    Same as `camping.get_num_available_sites`, computed on an
+    AvailabilityMatrix.
+    """
+    matrix = AvailabilityMatrix(
+        park_information, start_date, end_date, weekends_only=weekends_only
+    )
+
+    night_counts = nights if is_night_counts(nights) else [nights]
+    resolved = {n: resolve_nights(n, matrix.num_days) for n in night_counts}
+    for n, resolved_n in resolved.items():
+        if n != resolved_n:
+            LOG.debug("Setting number of nights to {}.".format(resolved_n))
+    num_available = dict.fromkeys(set(resolved.values()), 0)
+    available_dates_by_campsite_id = {
+        n: defaultdict(list) for n in num_available
+    }
+
+    for site in matrix.masks:
+        if len(num_available) == 1:
+            (n,) = num_available
+            start_days = {n: matrix.start_days(site, n)}
+        else:
+            start_days = matrix.start_days_by_nights(site, num_available)
+
+        for n, starts in start_days.items():
+            if compact:
+                appropriate_consecutive_ranges = matrix.runs(site, n, starts)
+            else:
+                appropriate_consecutive_ranges = matrix.ranges(site, n, starts)
+
+            if appropriate_consecutive_ranges:
+                num_available[n] += 1
+                LOG.debug("Available site {}: {}".format(num_available[n], site))
+
+            for start, end in appropriate_consecutive_ranges:
+                available_dates_by_campsite_id[n][int(site)].append(
+                    {"start": start, "end": end}
+                )
+
+    results = {
+        n: (
+            num_available[resolved_n],
+            matrix.maximum,
+            available_dates_by_campsite_id[resolved_n],
+        )
+        for n, resolved_n in resolved.items()
+    }
+    if is_night_counts(nights):
+        return results
+    return results[nights]
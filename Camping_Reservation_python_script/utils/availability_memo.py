@@ -0,0 +1,67 @@
+import array
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils.sqlite_cache import CacheStats
+
+
+def digest_park_information(park_information):
+    """
+    Returns a digest of the content of `park_information` (see
+    `camping.get_park_information`), the same for equal availability no
+    matter where it was downloaded or parsed.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for site in sorted(park_information):
+        digest.update(str(site).encode() + b":")
+        digest.update(array.array("q", park_information[site]).tobytes())
+    return digest.hexdigest()
+
+
+class AvailabilityMemo:
+    """
+    Remembers the last `max_entries` results of `get_num_available_sites`
+    by the content of the park information and the search parameters, so
+    evaluating unchanged availability again (the next polling cycle, another
+    user with the same search) costs a digest instead of a recomputation.
+
+    Results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    def get_or_compute(self, park_information, params, compute):
+        """
+        Returns the result memoized for `park_information` and `params`, a
+        hashable tuple of search parameters, or stores and returns
+        `compute()`.
+        """
+        key = (digest_park_information(park_information), params)
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.stats.record(hits=1)
+                return self._results[key]
+
+        self.stats.record(misses=1)
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+                self.stats.record(evictions=1)
+        return result
+
+    def __len__(self):
+        with self._lock:
+            return len(self._results)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
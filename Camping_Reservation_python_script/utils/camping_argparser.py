@@ -3,7 +3,9 @@ import logging
 import sys
 from datetime import datetime
 
+from clients.recreation_client import RecreationClient
 from enums.date_format import DateFormat
+from utils.windows import recurring_windows, window_span
 
 
 class CampingArgumentParser(argparse.ArgumentParser):
@@ -14,21 +16,55 @@ class CampingArgumentParser(argparse.ArgumentParser):
         )
         self.add_argument(
             "--start-date",
-            required=True,
-            help="Start date [YYYY-MM-DD]",
+            help="Start date [YYYY-MM-DD]. Required unless --window is given.",
             type=self.TypeConverter.date,
         )
         self.add_argument(
             "--end-date",
-            required=True,
-            help="End date [YYYY-MM-DD]. You expect to leave this day, not stay the night.",
+            help=(
+                "End date [YYYY-MM-DD]. You expect to leave this day, not stay "
+                "the night. Required unless --window is given."
+            ),
             type=self.TypeConverter.date,
         )
         self.add_argument(
-            "--nights",
-            help="Number of consecutive nights (default is all nights in the given range).",
+            "--window",
+            dest="windows",
+            action="append",
+            default=[],
+            metavar="START:END",
+            help=(
+                "Date window to search [YYYY-MM-DD:YYYY-MM-DD], repeat the "
+                "flag for several windows. Months shared by windows are only "
+                "downloaded once and the output has one section per window."
+            ),
+            type=self.TypeConverter.window,
+        )
+        self.add_argument(
+            "--window-rule",
+            metavar="RRULE",
+            help=(
+                "Search a window starting on every occurrence of an iCalendar "
+                "recurrence rule between --start-date and --end-date, e.g. "
+                '"FREQ=WEEKLY;BYDAY=FR" with --window-length 2 for every '
+                "weekend."
+            ),
+        )
+        self.add_argument(
+            "--window-length",
+            help="Number of nights of each --window-rule window.",
             type=self.TypeConverter.positive_int,
         )
+        self.add_argument(
+            "--nights",
+            help=(
+                "Number of consecutive nights (default is all nights in the "
+                "given range). Several counts can be searched at once with a "
+                "range or a list, e.g. 2-4 or 2,3,5; the output then has one "
+                "section per count."
+            ),
+            type=self.TypeConverter.nights,
+        )
         self.add_argument(
             "--campsite-ids",
             type=int,
@@ -71,6 +107,139 @@ class CampingArgumentParser(argparse.ArgumentParser):
                 "File with site IDs to exclude"
             ),
         )
+        self.add_argument(
+            "--prefilter",
+            action="store_true",
+            help=(
+                "Ask recreation.gov's search for the number of available sites "
+                "first and skip downloading parks that have none. Only used "
+                "when every night of the range is needed (no --nights or "
+                "--nights covering the whole range)."
+            ),
+        )
+        self.add_argument(
+            "--compact",
+            action="store_true",
+            help=(
+                "With --show-campsite-info or --json-output, list each site's "
+                "longest runs of free nights instead of every possible stay, "
+                "followed by the number of sites per start date of each park."
+            ),
+        )
+        self.add_argument(
+            "--engine",
+            choices=["bitset", "groupby"],
+            default="bitset",
+            help=(
+                "How consecutive nights are found: with one bitmask per site "
+                "(default) or by grouping each site's dates."
+            ),
+        )
+        self.add_argument(
+            "--max-concurrency",
+            default=1,
+            help=(
+                "Maximum number of months fetched in parallel for a park "
+                "(default is 1, i.e. one month at a time)."
+            ),
+            type=self.TypeConverter.positive_int,
+        )
+        self.add_argument(
+            "--parallel-parks",
+            default=1,
+            help=(
+                "Maximum number of parks checked at the same time (default "
+                "is 1). Each park is reported on stderr as soon as it is done."
+            ),
+            type=self.TypeConverter.positive_int,
+        )
+        self.add_argument(
+            "--pool-size",
+            help=(
+                "Number of HTTP connections kept open to recreation.gov "
+                "(default is 10, or --max-concurrency times "
+                "--parallel-parks if that is larger)."
+            ),
+            type=self.TypeConverter.positive_int,
+        )
+        self.add_argument(
+            "--no-keep-alive",
+            action="store_true",
+            help="Close the HTTP connection after every request.",
+        )
+        self.add_argument(
+            "--cache-ttl",
+            default=0,
+            help=(
+                "Reuse availability fetched in the last N seconds, also by "
+                "other runs (default is 0, no caching)."
+            ),
+            type=int,
+        )
+        self.add_argument(
+            "--cache-file",
+            help="SQLite file used by --cache-ttl.",
+        )
+        self.add_argument(
+            "--cache-size",
+            default=10000,
+            help=(
+                "Maximum number of park-months kept by --cache-ttl; the least "
+                "recently used are dropped first (default is 10000)."
+            ),
+            type=self.TypeConverter.positive_int,
+        )
+        self.add_argument(
+            "--metadata-cache-ttl",
+            default=0,
+            help=(
+                "Reuse campground names fetched in the last N seconds, also "
+                "by other runs, stored in --cache-file (default is 0, no "
+                "caching)."
+            ),
+            type=int,
+        )
+        self.add_argument(
+            "--memo-size",
+            default=0,
+            help=(
+                "Remember the last N availability results by the content of "
+                "the downloaded availability and the search, so unchanged "
+                "availability is not evaluated again (default is 0, off)."
+            ),
+            type=int,
+        )
+        self.add_argument(
+            "--max-retries",
+            default=3,
+            help=(
+                "Number of times a request failing with a connection error, "
+                "429 or 5xx is retried (default is 3)."
+            ),
+            type=int,
+        )
+        self.add_argument(
+            "--retry-budget",
+            default=20,
+            help=(
+                "Maximum number of retries for the whole run, across all "
+                "requests (default is 20)."
+            ),
+            type=int,
+        )
+        self.add_argument(
+            "--rate-limit",
+            action="append",
+            default=[],
+            metavar="[ENDPOINT=]RATE",
+            help=(
+                "Maximum requests per second to recreation.gov, shared by "
+                "every process on this machine. Either one rate for all "
+                "endpoints or e.g. availability=2 campground=0.5 (repeat the "
+                "flag). Endpoints are availability, campground and search."
+            ),
+            type=self.TypeConverter.rate_limit,
+        )
         parks_group = self.add_mutually_exclusive_group(required=True)
         parks_group.add_argument(
             "--parks",
@@ -91,6 +260,15 @@ class CampingArgumentParser(argparse.ArgumentParser):
         args = super().parse_args(args, namespace)
         args.parks = args.parks or [p.strip() for p in sys.stdin]
         self._validate_args(args)
+        if args.window_rule:
+            args.windows += recurring_windows(
+                args.window_rule, args.start_date, args.end_date, args.window_length
+            )
+        if args.windows:
+            args.windows = sorted(set(args.windows))
+            args.start_date, args.end_date = window_span(
+                args.windows, args.start_date, args.end_date
+            )
         return args
 
     @classmethod
@@ -99,6 +277,18 @@ class CampingArgumentParser(argparse.ArgumentParser):
             raise cls.ArgumentCombinationError(
                 "--campsite-ids can only be used with a single park ID."
             )
+        if args.window_rule and not (
+            args.start_date and args.end_date and args.window_length
+        ):
+            raise cls.ArgumentCombinationError(
+                "--window-rule needs --start-date, --end-date and --window-length."
+            )
+        if not args.windows and not args.window_rule and not (
+            args.start_date and args.end_date
+        ):
+            raise cls.ArgumentCombinationError(
+                "--start-date and --end-date are required without --window."
+            )
 
     class TypeConverter:
         @classmethod
@@ -112,13 +302,62 @@ class CampingArgumentParser(argparse.ArgumentParser):
                 logging.critical(e)
                 raise argparse.ArgumentTypeError(msg)
 
+        @classmethod
+        def window(cls, value):
+            """
+            Parses "2025-06-06:2025-06-08" into a (start, end) pair.
+            """
+            start, _, end = value.partition(":")
+            try:
+                start, end = cls.date(start), cls.date(end)
+            except argparse.ArgumentTypeError:
+                start = end = None
+            if start is None or end <= start:
+                msg = "Not a valid window: '{0}'".format(value)
+                raise argparse.ArgumentTypeError(msg)
+            return start, end
+
         @classmethod
         def positive_int(cls, i):
             i = int(i)
             if i <= 0:
-                msg = "Not a valid number of nights: {0}".format(i)
+                msg = "Not a valid positive number: {0}".format(i)
                 raise argparse.ArgumentTypeError(msg)
             return i
 
+        @classmethod
+        def nights(cls, value):
+            """
+            Parses "3", "2-4" or "2,3,5" into 3, (2, 3, 4) or (2, 3, 5).
+            """
+            try:
+                if "-" in value:
+                    first, last = map(int, value.split("-"))
+                    counts = range(first, last + 1)
+                elif "," in value:
+                    counts = [int(count) for count in value.split(",")]
+                else:
+                    return cls.positive_int(value)
+            except ValueError:
+                counts = []
+            if not counts or min(counts) <= 0:
+                msg = "Not a valid number of nights: '{0}'".format(value)
+                raise argparse.ArgumentTypeError(msg)
+            return tuple(sorted(set(counts)))
+
+        @classmethod
+        def rate_limit(cls, value):
+            endpoint, _, rate = value.rpartition("=")
+            try:
+                rate = float(rate)
+            except ValueError:
+                rate = 0
+            if rate <= 0 or endpoint and endpoint not in RecreationClient.ENDPOINTS:
+                msg = "Not a valid rate limit: '{0}' (endpoints are {1})".format(
+                    value, ", ".join(RecreationClient.ENDPOINTS)
+                )
+                raise argparse.ArgumentTypeError(msg)
+            return endpoint or None, rate
+
     class ArgumentCombinationError(Exception):
         pass
@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+from enums.date_format import DateFormat
+from utils import formatter
+
+
+class DayCalendar:
+    """
+    Every day from `start_date` to `end_date` (both included), by ordinal
+    (see `date.toordinal`).
+
+    Availability dates are turned into ordinals once, when the API response
+    is read (`parse_response_date`), and stay ordinals until they are
+    output. The dates and weekdays of the calendar are computed up front so
+    looking them up costs an index rather than a parse.
+    """
+
+    def __init__(self, start_date, end_date):
+        self.first = start_date.toordinal()
+        self.last = end_date.toordinal()
+        first_date = date.fromordinal(self.first)
+        self.dates = [
+            first_date + timedelta(days=d)
+            for d in range(self.last - self.first + 1)
+        ]
+        self.weekdays = [day.weekday() for day in self.dates]
+        self._ordinal_by_response_date = {
+            formatter.format_date(
+                day, format_string=DateFormat.ISO_DATE_FORMAT_RESPONSE.value
+            ): self.first + d
+            for d, day in enumerate(self.dates)
+        }
+
+    def __contains__(self, ordinal):
+        return self.first <= ordinal <= self.last
+
+    def date(self, ordinal):
+        return self.dates[ordinal - self.first]
+
+    def weekday(self, ordinal):
+        return self.weekdays[ordinal - self.first]
+
+    def parse_response_date(self, date_string):
+        """
+        Returns the ordinal of a date of the availability response, or None
+        if it is outside the calendar.
+        """
+        return self._ordinal_by_response_date.get(date_string)
+
+
+@lru_cache(maxsize=32)
+def get_calendar(start_date, end_date):
+    """
+    Returns the DayCalendar from `start_date` to `end_date`, shared by every
+    park of a search.
+    """
+    return DayCalendar(start_date, end_date)
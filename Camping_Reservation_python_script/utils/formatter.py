@@ -14,6 +14,16 @@ def format_date(
     return date_formatted
 
 
+def parse_date(date_value, format_string=DateFormat.INPUT_DATE_FORMAT.value):
+    """
+    Returns `date_value` as a datetime, parsing it with `format_string` if
+    it is a string.
+    """
+    if isinstance(date_value, str):
+        return datetime.strptime(date_value, format_string)
+    return date_value
+
+
 def site_date_to_human_date(date_string):
     date_object = datetime.strptime(
         date_string, DateFormat.ISO_DATE_FORMAT_RESPONSE
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+
+from utils.stats import Counters
+
+
+def digest_month(month_data):
+    """
+    Returns a digest of one availability response, the same for responses
+    with equal content.
+    """
+    return hashlib.blake2b(
+        json.dumps(month_data, sort_keys=True).encode(), digest_size=16
+    ).hexdigest()
+
+
+class IncrementalStats(Counters):
+    FIELDS = ("months_changed", "months_reused", "sites_recomputed", "sites_reused")
+
+
+class IncrementalAvailability:
+    """
+    The availability of one park for one search, kept between evaluations
+    so that the next evaluation only redoes what changed.
+
+    `collapse(month_data)` turns one availability response into `{site:
+    [ordinal]}` (see `camping.collapse_park_information`) and
+    `evaluate(park_information)` returns the `{nights: (current, maximum,
+    available_dates_by_site_id)}` of `get_num_available_sites`.
+
+    Months whose response is unchanged are not collapsed again, and only
+    the sites whose nights changed in some month are evaluated again. The
+    stays of a site only depend on that site's nights, so every stay of a
+    changed site is recomputed, including those crossing into unchanged
+    months, and the stays of every other site are reused.
+    """
+
+    def __init__(self, collapse, evaluate, stats=None):
+        self.collapse = collapse
+        self.evaluate = evaluate
+        self.stats = stats or IncrementalStats()
+        self._lock = threading.Lock()
+        self.month_digests = {}
+        self.sites_by_month = {}
+        # {nights: {site: available dates}} of every site with availability.
+        self.dates_by_nights = {}
+
+    def update(self, months, api_data):
+        """
+        Evaluates the availability responses `api_data` of `months` and
+        returns `{nights: (current, maximum, available_dates_by_site_id)}`.
+        """
+        with self._lock:
+            return self._update(months, api_data)
+
+    def _update(self, months, api_data):
+        digests = dict(zip(months, map(digest_month, api_data)))
+        changed_sites = set()
+        num_changed_months = 0
+        for month_date, month_data in zip(months, api_data):
+            if self.month_digests.get(month_date) == digests[month_date]:
+                continue
+            num_changed_months += 1
+            sites = self.collapse(month_data)
+            old_sites = self.sites_by_month.get(month_date, {})
+            changed_sites.update(
+                site
+                for site in sites.keys() | old_sites.keys()
+                if sites.get(site) != old_sites.get(site)
+            )
+            self.sites_by_month[month_date] = sites
+        for month_date in set(self.sites_by_month) - set(digests):
+            changed_sites.update(self.sites_by_month.pop(month_date))
+        self.month_digests = digests
+
+        all_sites = {}
+        for month_date in months:
+            for site, ordinals in self.sites_by_month[month_date].items():
+                all_sites.setdefault(site, []).extend(ordinals)
+
+        recomputed = {
+            site: all_sites[site] for site in changed_sites if site in all_sites
+        }
+        self.stats.record(
+            months_changed=num_changed_months,
+            months_reused=len(months) - num_changed_months,
+            sites_recomputed=len(recomputed),
+            sites_reused=len(all_sites) - len(recomputed),
+        )
+
+        results = self.evaluate(recomputed)
+        for nights, (_, _, dates_by_site_id) in results.items():
+            dates = self.dates_by_nights.setdefault(nights, {})
+            for site in changed_sites:
+                dates.pop(site, None)
+                if int(site) in dates_by_site_id:
+                    dates[site] = dates_by_site_id[int(site)]
+
+        return {
+            nights: (
+                len(dates),
+                len(all_sites),
+                {int(site): dates[site] for site in all_sites if site in dates},
+            )
+            for nights, dates in self.dates_by_nights.items()
+            if nights in results
+        }
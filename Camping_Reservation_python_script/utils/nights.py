@@ -0,0 +1,17 @@
+def is_night_counts(nights):
+    """
+    Whether `nights` is a collection of night counts (e.g. `range(2, 5)`)
+    rather than a single count or None.
+    """
+    return nights is not None and not isinstance(nights, int)
+
+
+def resolve_nights(nights, num_days):
+    """
+    Returns the number of consecutive nights to look for in a range of
+    `num_days` nights: `nights`, or every night of the range if `nights` is
+    missing or doesn't fit.
+    """
+    if nights not in range(1, num_days + 1):
+        return num_days
+    return nights
@@ -0,0 +1,97 @@
+import os
+import time
+
+from utils.sqlite_connection import LocalConnection
+from utils.stats import Counters
+
+DEFAULT_RATE_LIMIT_FILE = os.path.join(
+    os.path.expanduser("~"),
+    ".cache",
+    "recreation-gov-campsite-checker",
+    "rate_limit.sqlite3",
+)
+
+
+class RateLimiterStats(Counters):
+    FIELDS = ("acquired", "waited", "wait_time")
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at `rate` tokens per second and holding at most
+    `capacity` tokens, whose state is stored in a SQLite file so that every
+    thread and every process on the machine using the same `path` and `name`
+    shares it.
+
+    Each `acquire` takes one token, sleeping until one is available.
+    """
+
+    def __init__(self, name, rate, capacity=None, path=DEFAULT_RATE_LIMIT_FILE):
+        if rate <= 0:
+            raise ValueError("rate must be positive, got {}".format(rate))
+        self.name = name
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self.path = path
+        self.stats = RateLimiterStats()
+        self._connection = LocalConnection(
+            path,
+            (
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " name TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)",
+            ),
+        )
+        self._connection.get()
+
+    def _take(self):
+        """
+        Takes a token if there is one. Returns 0 on success, otherwise the
+        number of seconds until the next token is due.
+        """
+        conn = self._connection.get()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?",
+                (self.name,),
+            ).fetchone()
+            if row is None:
+                tokens = self.capacity
+            else:
+                tokens, updated_at = row
+                elapsed = max(now - updated_at, 0)
+                tokens = min(self.capacity, tokens + elapsed * self.rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at)"
+                " VALUES (?, ?, ?)",
+                (self.name, tokens, now),
+            )
+        return wait
+
+    def acquire(self):
+        """
+        Blocks until a token is available and returns the seconds spent
+        waiting.
+        """
+        started = time.monotonic()
+        slept = False
+        wait = self._take()
+        while wait:
+            slept = True
+            time.sleep(wait)
+            wait = self._take()
+        waited = time.monotonic() - started if slept else 0.0
+        self.stats.record(acquired=1, waited=1 if slept else 0, wait_time=waited)
+        return waited
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,162 @@
+from bisect import bisect_right
+
+
+class SiteIdSet:
+    """
+    Campsite IDs, given one by one or as inclusive ranges, e.g. to exclude.
+    Single IDs are looked up in a frozenset and ranges by bisection, so
+    even tens of thousands of IDs cost the same per site.
+    """
+
+    __slots__ = ("site_ids", "starts", "ends")
+
+    def __init__(self, site_ids=(), ranges=()):
+        self.site_ids = frozenset(str(site_id) for site_id in site_ids)
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = tuple(start for start, _ in merged)
+        self.ends = tuple(end for _, end in merged)
+
+    def __contains__(self, campsite_id):
+        if str(campsite_id) in self.site_ids:
+            return True
+        if not self.starts:
+            return False
+        try:
+            campsite_id = int(campsite_id)
+        except ValueError:
+            return False
+        i = bisect_right(self.starts, campsite_id) - 1
+        return i >= 0 and campsite_id <= self.ends[i]
+
+    def __bool__(self):
+        return bool(self.site_ids or self.starts)
+
+    def __eq__(self, other):
+        return isinstance(other, SiteIdSet) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self):
+        return self.site_ids, self.starts, self.ends
+
+    def union(self, other):
+        return SiteIdSet(
+            self.site_ids | other.site_ids,
+            list(zip(self.starts + other.starts, self.ends + other.ends)),
+        )
+
+
+EMPTY_SITE_ID_SET = SiteIdSet()
+
+
+class SiteExclusions:
+    """
+    The campsites to exclude from every park, plus those to exclude from
+    one park only, as read from an exclusion file (see `parse`).
+    """
+
+    def __init__(self, everywhere=EMPTY_SITE_ID_SET, by_park=None):
+        self.everywhere = everywhere
+        self.by_park = by_park or {}
+        self._for_park = {}
+
+    @classmethod
+    def parse(cls, lines):
+        """
+        Parses lines holding a campsite ID ("12345") or an inclusive range
+        of them ("12345-12399"), optionally scoped to one park with a
+        "park_id:" prefix ("232447:12345"). Any other line is excluded from
+        every park as a literal campsite ID, as it always was.
+        """
+        site_ids = {None: []}
+        ranges = {None: []}
+        for line in lines:
+            park_id, _, sites = line.rpartition(":")
+            park_id = park_id.strip() or None
+            start, _, end = sites.partition("-")
+            try:
+                start = int(start)
+                end = int(end) if end else None
+            except ValueError:
+                site_ids[None].append(line.strip())
+                continue
+            site_ids.setdefault(park_id, [])
+            ranges.setdefault(park_id, [])
+            if end is None:
+                site_ids[park_id].append(start)
+            else:
+                ranges[park_id].append((start, end))
+        return cls(
+            SiteIdSet(site_ids.pop(None), ranges.pop(None)),
+            {
+                park_id: SiteIdSet(site_ids[park_id], ranges[park_id])
+                for park_id in site_ids
+            },
+        )
+
+    def for_park(self, park_id):
+        """
+        Returns the SiteIdSet of the campsites to exclude from `park_id`.
+        """
+        park_id = str(park_id)
+        site_id_set = self._for_park.get(park_id)
+        if site_id_set is None:
+            site_id_set = self.everywhere
+            if park_id in self.by_park:
+                site_id_set = site_id_set.union(self.by_park[park_id])
+            self._for_park[park_id] = site_id_set
+        return site_id_set
+
+
+def excluded_for_park(excluded_site_ids, park_id):
+    """
+    Returns the SiteIdSet of the campsites to exclude from `park_id`, where
+    `excluded_site_ids` is a SiteExclusions, a SiteIdSet or a collection of
+    campsite IDs.
+    """
+    if isinstance(excluded_site_ids, SiteExclusions):
+        return excluded_site_ids.for_park(park_id)
+    return as_site_id_set(excluded_site_ids)
+
+
+def as_site_id_set(site_ids):
+    if isinstance(site_ids, SiteIdSet):
+        return site_ids
+    if not site_ids:
+        return EMPTY_SITE_ID_SET
+    return SiteIdSet(site_ids)
+
+
+class SiteFilter:
+    """
+    The campsite filters of a search, compiled once and applied to each
+    site of a response before any of its dates are read.
+    """
+
+    __slots__ = ("campsite_type", "campsite_ids", "excluded")
+
+    def __init__(self, campsite_type=None, campsite_ids=(), excluded_site_ids=()):
+        self.campsite_type = campsite_type
+        self.campsite_ids = frozenset(int(site_id) for site_id in campsite_ids)
+        self.excluded = as_site_id_set(excluded_site_ids)
+
+    def excludes(self, campsite_id):
+        """
+        Whether the site is left out of the park altogether.
+        """
+        return campsite_id in self.excluded
+
+    def matches(self, campsite_data):
+        """
+        Whether the availability of the site is wanted. Sites that don't
+        match still count towards the number of sites of the park.
+        """
+        if self.campsite_type and self.campsite_type != campsite_data["campsite_type"]:
+            return False
+        return not self.campsite_ids or int(campsite_data["campsite_id"]) in self.campsite_ids
@@ -0,0 +1,187 @@
+import json
+import os
+import time
+import uuid
+
+from utils.sqlite_connection import LocalConnection
+from utils.stats import Counters
+
+DEFAULT_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"),
+    ".cache",
+    "recreation-gov-campsite-checker",
+    "cache.sqlite3",
+)
+
+
+class CacheStats(Counters):
+    FIELDS = ("hits", "misses", "expired", "evictions")
+
+
+class SQLiteCache:
+    """
+    A small JSON key/value cache stored in a SQLite file.
+
+    SQLite does the locking, so the same file can be shared by several
+    processes (e.g. cron jobs and gunicorn workers) and threads; every thread
+    gets its own connection. Entries older than `ttl` seconds are treated as
+    missing, and once a namespace holds more than `max_entries` entries the
+    least recently used ones are evicted.
+
+    Several caches can live in one file as long as they use different
+    `namespace`s.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, namespace="default", ttl=300, max_entries=10000):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = CacheStats()
+        self._connection = LocalConnection(
+            path,
+            (
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))",
+                "CREATE INDEX IF NOT EXISTS cache_lru"
+                " ON cache (namespace, accessed_at)",
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " token TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))",
+            ),
+        )
+        self._connection.get()
+
+    def get(self, key, default=None):
+        conn = self._connection.get()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            self.stats.record(misses=1)
+            return default
+
+        value, created_at = row
+        if self.ttl is not None and now - created_at > self.ttl:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ? AND created_at = ?",
+                (self.namespace, key, created_at),
+            )
+            self.stats.record(misses=1, expired=1)
+            return default
+
+        conn.execute(
+            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, self.namespace, key),
+        )
+        self.stats.record(hits=1)
+        return json.loads(value)
+
+    def set(self, key, value):
+        conn = self._connection.get()
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache"
+                " (namespace, key, value, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now),
+            )
+            if self.max_entries is not None:
+                evicted = conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ?"
+                    " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                ).rowcount
+                if evicted:
+                    self.stats.record(evictions=evicted)
+
+    def acquire_lease(self, key, timeout):
+        """
+        Claims the right to compute the value of `key` for up to `timeout`
+        seconds, so other processes can wait for it (see `wait_for`) instead
+        of computing it too. Returns a token to pass to `release_lease`, or
+        None if somebody else holds an unexpired lease.
+        """
+        conn = self._connection.get()
+        token = uuid.uuid4().hex
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "DELETE FROM leases WHERE namespace = ? AND key = ? AND expires_at < ?",
+                (self.namespace, key, now),
+            )
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO leases (namespace, key, token, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (self.namespace, key, token, now + timeout),
+            ).rowcount
+        return token if inserted else None
+
+    def release_lease(self, key, token):
+        self._connection.get().execute(
+            "DELETE FROM leases WHERE namespace = ? AND key = ? AND token = ?",
+            (self.namespace, key, token),
+        )
+
+    def wait_for(self, key, timeout, interval=0.1, default=None):
+        """
+        Waits up to `timeout` seconds for the holder of the lease on `key` to
+        store a fresh value and returns it. Returns `default` if the lease is
+        released or expires without a value showing up.
+        """
+        conn = self._connection.get()
+        deadline = time.monotonic() + timeout
+        while True:
+            now = time.time()
+            # Check the lease first: the holder stores the value before
+            # releasing it, so a released lease means the value is in place.
+            leased = conn.execute(
+                "SELECT 1 FROM leases"
+                " WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                (self.namespace, key, now),
+            ).fetchone()
+            oldest = now - self.ttl if self.ttl is not None else float("-inf")
+            row = conn.execute(
+                "SELECT value FROM cache"
+                " WHERE namespace = ? AND key = ? AND created_at >= ?",
+                (self.namespace, key, oldest),
+            ).fetchone()
+            if row is not None:
+                self.stats.record(hits=1)
+                return json.loads(row[0])
+            if leased is None or time.monotonic() >= deadline:
+                return default
+            time.sleep(interval)
+
+    def delete(self, key):
+        self._connection.get().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def clear(self):
+        self._connection.get().execute(
+            "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+        )
+
+    def __len__(self):
+        return self._connection.get().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,43 @@
+import os
+import sqlite3
+import threading
+
+
+class LocalConnection:
+    """
+    A SQLite connection to the file at `path` for each thread and process,
+    as connections must not cross threads or forks. Each connection is in
+    autocommit mode with a write-ahead log, so several processes can share
+    the file, and runs the `schema` statements (e.g. "CREATE TABLE IF NOT
+    EXISTS ...") when it is opened.
+    """
+
+    def __init__(self, path, schema=()):
+        self.path = path
+        self.schema = tuple(schema)
+        self._local = threading.local()
+        if path != ":memory:":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.schema:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def close(self):
+        """
+        Closes the connection of the calling thread, if it has one.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,28 @@
+import threading
+
+
+class Counters:
+    """
+    Thread-safe counters named by `FIELDS`, e.g. the hits and misses of a
+    cache. Subclasses only list their fields.
+    """
+
+    FIELDS = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for name in self.FIELDS:
+            setattr(self, name, 0)
+
+    def record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        with self._lock:
+            counts = {name: getattr(self, name) for name in self.FIELDS}
+        return {
+            name: round(value, 3) if isinstance(value, float) else value
+            for name, value in counts.items()
+        }
@@ -0,0 +1,97 @@
+import json
+
+from models.classification import IGNORED, PRIORITY, REGULAR, TIERS
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# The tiers of camping_wrapper.py: weekends first, then stays touching a
+# weekend, everything else ignored. Rules are tried in order for the number
+# of nights searched; "5+" matches 5 nights or more, a missing "start" or
+# "end" matches any day.
+DEFAULT_RULES = {
+    "rules": [
+        {"nights": 1, "start": ["fri", "sat"], "tier": PRIORITY},
+        {"nights": 1, "start": ["thu", "sun"], "tier": REGULAR},
+        {"nights": 2, "start": ["fri"], "tier": PRIORITY},
+        {
+            "nights": 2,
+            "start": ["thu", "fri", "sat", "sun"],
+            "end": ["sat", "sun", "mon"],
+            "tier": REGULAR,
+        },
+        {"nights": 3, "start": ["thu", "fri"], "tier": PRIORITY},
+        {"nights": 4, "start": ["thu"], "tier": PRIORITY},
+        {"nights": "5+", "tier": PRIORITY},
+    ],
+    "default": IGNORED,
+}
+
+
+class InvalidTierRules(ValueError):
+    pass
+
+
+class TierRules:
+    """
+    A rule table compiled into one 7 x 7 lookup table per number of nights
+    searched, indexed by the check-in and check-out weekdays, so the tier of
+    a stay is a single index rather than a walk through the rules.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        default = rules.get("default", IGNORED)
+        parsed = [self._parse_rule(rule) for rule in rules.get("rules", [])]
+        for tier in [default] + [tier for _, _, _, _, tier in parsed]:
+            if tier not in TIERS:
+                raise InvalidTierRules("Unknown tier: {!r}".format(tier))
+
+        # Searches for more nights than any rule mentions all share the
+        # table of the last count.
+        self.max_nights = max([low + 1 for low, _, _, _, _ in parsed] + [1])
+        self.tables = [None]
+        for nights in range(1, self.max_nights + 1):
+            table = [default] * 49
+            # Fill in reverse so the first matching rule wins.
+            for low, high, starts, ends, tier in reversed(parsed):
+                if not low <= nights <= high:
+                    continue
+                for start in starts:
+                    for end in ends:
+                        table[start * 7 + end] = tier
+            self.tables.append(tuple(table))
+
+    @staticmethod
+    def _parse_rule(rule):
+        try:
+            nights = str(rule["nights"])
+            if nights.endswith("+"):
+                low, high = int(nights[:-1]), float("inf")
+            else:
+                low = high = int(nights)
+            starts = [WEEKDAYS.index(day.lower()) for day in rule.get("start", WEEKDAYS)]
+            ends = [WEEKDAYS.index(day.lower()) for day in rule.get("end", WEEKDAYS)]
+            return low, high, starts, ends, rule["tier"]
+        except (KeyError, ValueError, AttributeError) as e:
+            raise InvalidTierRules("Invalid rule {!r}: {}".format(rule, e))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def table(self, min_nights):
+        """
+        Returns the lookup table of a search for `min_nights` nights.
+        """
+        return self.tables[min(max(min_nights, 1), self.max_nights)]
+
+    def classify(self, date_range, min_nights):
+        """
+        Returns the tier of `date_range` for a search of `min_nights` nights,
+        or None if the stay is too short.
+        """
+        if date_range.nights < min_nights:
+            return None
+        return self.table(min_nights)[
+            date_range.start.weekday() * 7 + date_range.end.weekday()
+        ]
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from dateutil import rrule
+
+
+def recurring_windows(rule, start_date, end_date, length):
+    """
+    Returns the `(start, end)` window of `length` days starting on every
+    occurrence of the RRULE `rule` (e.g. "FREQ=WEEKLY;BYDAY=FR") from
+    `start_date` on, keeping the windows that end by `end_date`.
+    """
+    length = timedelta(days=length)
+    occurrences = rrule.rrulestr(rule, dtstart=start_date).between(
+        start_date, end_date - length, inc=True
+    )
+    return [(start, start + length) for start in occurrences]
+
+
+def window_span(windows, start_date=None, end_date=None):
+    """
+    Returns the `(start, end)` range to fetch for `windows`: from the
+    earliest start to the latest end of the windows, widened to
+    `start_date` and `end_date` if they are given, so no window is ever cut
+    short by an explicit range.
+    """
+    starts = [start for start, _ in windows]
+    ends = [end for _, end in windows]
+    if start_date is not None:
+        starts.append(start_date)
+    if end_date is not None:
+        ends.append(end_date)
+    return min(starts), max(ends)
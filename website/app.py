@@ -1,12 +1,11 @@
 from flask import Flask, render_template, request, jsonify
+import argparse
 import sys
 import os
 from datetime import datetime
-import subprocess
 import logging
 from werkzeug.exceptions import HTTPException
 import traceback
-import re  # Add this at the top with other imports
 import requests
 from math import radians, sin, cos, sqrt, atan2
 from logging.handlers import RotatingFileHandler
@@ -44,9 +43,46 @@ logger.setLevel(logging.INFO)
 logger.addHandler(file_handler)
 
 # Update paths and environment settings
-SCRIPT_DIR = '/Users/darshan/Projects/Camping_Reservation/Camping_Reservation_python_script/'
-SCRIPT_NAME = 'camping_notification.py'
-VENV_PYTHON = '/Users/darshan/.pyenv/versions/3.12.2/bin/python'
+SCRIPT_DIR = os.environ.get(
+    'CAMPING_SCRIPT_DIR',
+    '/Users/darshan/Projects/Camping_Reservation/Camping_Reservation_python_script/'
+)
+# Cache availability across searches and gunicorn workers (0 disables)
+CACHE_TTL = int(os.environ.get('CAMPING_CACHE_TTL', '60'))
+# Cache campground names for a week, they hardly ever change (0 disables)
+METADATA_CACHE_TTL = int(os.environ.get('CAMPING_METADATA_CACHE_TTL', '604800'))
+# Reuse results computed from unchanged availability (0 disables)
+MEMO_SIZE = int(os.environ.get('CAMPING_MEMO_SIZE', '128'))
+# Requests per second to recreation.gov shared with every other checker on
+# this machine, e.g. '2' or 'availability=2 campground=0.5' (empty disables)
+RATE_LIMIT = os.environ.get('CAMPING_RATE_LIMIT', '')
+
+# The search runs in-process, so import it from the script directory
+sys.path.insert(0, SCRIPT_DIR)
+import camping  # noqa: E402
+import camping_wrapper  # noqa: E402
+from clients.recreation_client import RecreationClient  # noqa: E402
+from models.classification import TIERS  # noqa: E402
+from utils.camping_argparser import CampingArgumentParser  # noqa: E402
+
+RecreationClient.configure_cache(CACHE_TTL)
+RecreationClient.configure_metadata_cache(METADATA_CACHE_TTL)
+camping.configure_memo(MEMO_SIZE)
+rate_limits = []
+for value in RATE_LIMIT.split():
+    try:
+        rate_limits.append(CampingArgumentParser.TypeConverter.rate_limit(value))
+    except argparse.ArgumentTypeError as e:
+        # A typo shouldn't keep the site from starting
+        logger.error(f"Ignoring CAMPING_RATE_LIMIT value: {e}")
+camping.configure_rate_limits(rate_limits)
+
+# The result tiers to return for each searchPreference of the search form,
+# all of them for 'all' or anything else
+SEARCH_PREFERENCE_TIERS = {
+    'weekends': ('priority',),
+    'flexible': ('priority', 'regular'),
+}
 
 # Global counter for script executions
 script_executions = {
@@ -71,94 +107,6 @@ def about():
 def history():
     return render_template('history.html', MAPS_API_KEY=MAPS_API_KEY)
 
-def read_process_output(process):
-    """Read output from process line by line and parse results"""
-    results = {
-        'priority': [],
-        'regular': [],
-        'ignored': [],
-        'changes': [],
-        'campground_name': None
-    }
-    
-    try:
-        # Wait for process to complete and get output
-        output, error = process.communicate()
-        
-        # Print raw output to terminal
-        print("\n=== Raw Script Output ===")
-        print(output)
-        if error:
-            print("\n=== Script Errors ===")
-            print(error)
-        
-        # Log output
-        logger.info("\n=== Raw Script Output ===")
-        logger.info(output)
-        if error:
-            logger.error(f"Script errors: {error}")
-
-        current_section = None
-        full_results_started = False
-        
-        # Process each line
-        for line in output.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Debug: Print each line being processed
-            print(f"Processing line: {line}")
-            
-            # Start capturing after Full Results marker
-            if "=== Full Results for Reference ===" in line:
-                print("Found Full Results marker")
-                full_results_started = True
-                continue
-            
-            if not full_results_started:
-                continue
-            
-            # Identify sections
-            if "**Priority Results:**" in line:
-                print("Entering Priority section")
-                current_section = 'priority'
-                continue
-            elif "**Regular Results:**" in line:
-                print("Entering Regular section")
-                current_section = 'regular'
-                continue
-            elif "**Ignored Results:**" in line:
-                print("Entering Ignored section")
-                current_section = 'ignored'
-                continue
-            
-            # Capture results
-            if current_section and "->" in line:
-                print(f"Adding result to {current_section}: {line}")
-                results[current_section].append({
-                    'text': line,
-                    'timestamp': datetime.now().strftime('%H:%M:%S')
-                })
-        
-        return results
-        
-    except Exception as e:
-        print(f"Error processing output: {str(e)}")
-        logger.error(f"Error processing output: {str(e)}")
-        raise e
-
-def clean_text(text):
-    """Remove ANSI escape codes and other unwanted characters"""
-    # Remove ANSI escape codes
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    text = ansi_escape.sub('', text)
-    
-    # Remove other special characters but keep basic punctuation
-    text = ''.join(char for char in text if char.isprintable())
-    
-    return text.strip()
-
 @app.route('/search', methods=['POST'])
 def search():
     try:
@@ -191,37 +139,20 @@ def search():
         nights = data.get('nights')
         search_preference = data.get('searchPreference')
         
-        # Build command
-        cmd = [
-            VENV_PYTHON,
-            os.path.join(SCRIPT_DIR, SCRIPT_NAME),
-            '--start-date', start_date,
-            '--end-date', end_date,
-            '--parks', park_id,
-            '--nights', str(nights),
-            '--frequency', '0'
-        ]
-
-        # Add filters based on search preference
-        if search_preference == 'weekends':
-            cmd.extend(['--filters', 'priority'])
-        elif search_preference == 'flexible':
-            cmd.extend(['--filters', 'priority', 'regular'])
-        else:  # all dates
-            cmd.extend(['--filters', 'priority', 'regular', 'ignored'])
-
-        print("\n=== Executing Command ===")
-        print(f"Command: {' '.join(cmd)}")
-        
-        # Run the command and capture output directly
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            cwd=SCRIPT_DIR
+        # Only fill the tiers the preference asks for, like the
+        # --filters the search used to be run with
+        tiers = SEARCH_PREFERENCE_TIERS.get(search_preference, TIERS)
+
+        # Run the search in-process
+        print("\n=== Running Search ===")
+        print(f"Park: {park_id}, {start_date} -> {end_date}, {nights} night(s)")
+
+        # Every request gets the whole retry budget of a run.
+        RecreationClient.reset_retry_budget()
+        classification = camping_wrapper.search_and_filter(
+            start_date, end_date, [park_id], int(nights)
         )
 
-        # Parse the results
         results = {
             'priority': [],
             'regular': [],
@@ -229,42 +160,19 @@ def search():
             'campground_name': None
         }
 
-        current_section = None
-        capture_results = False
-
-        # Process the output line by line
-        for line in result.stdout.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-
-            # Capture campground name
-            if "🏕" in line and "CAMPGROUND" in line:
-                results['campground_name'] = clean_text(line)
-                continue
-
-            # Start capturing after Full Results marker
-            if "=== Full Results for Reference ===" in line:
-                capture_results = True
-                continue
-
-            if not capture_results:
-                continue
-
-            # Identify sections
-            if "**Priority Results:**" in line:
-                current_section = 'priority'
-            elif "**Regular Results:**" in line:
-                current_section = 'regular'
-            elif "**Ignored Results:**" in line:
-                current_section = 'ignored'
-            # Capture results if we're in a section
-            elif current_section and "->" in line:
-                clean_line = clean_text(line)
-                if clean_line:  # Only add if there's content after cleaning
-                    results[current_section].append({
-                        'text': clean_line,
-                        'timestamp': datetime.now().strftime('%H:%M:%S')
+        timestamp = datetime.now().strftime('%H:%M:%S')
+        for park in classification.parks:
+            if "CAMPGROUND" in park.park_name:
+                results['campground_name'] = f"🏕 {park.park_name}"
+            for section in tiers:
+                for date_range, site_count in park.tier(section).items():
+                    results[section].append({
+                        'text': f"{date_range} --> {site_count} site(s) available",
+                        'start': date_range.start.isoformat(),
+                        'end': date_range.end.isoformat(),
+                        'nights': date_range.nights,
+                        'site_count': site_count,
+                        'timestamp': timestamp
                     })
 
         return jsonify({